@@ -1,12 +1,14 @@
-import customtkinter as ctk
 from dotenv import load_dotenv
-from xmnz_tester.config import ConfigManager
-from xmnz_tester.gui.main_window import MainWindow
+from xmnz_tester.config import get_config
 
 def launch_gui():
     """
     Lanza la interfaz gráfica de usuario (GUI) para el tester.
     """
+    # Importaciones pesadas (Tk y toda la capa HAL) solo cuando se lanza la GUI
+    import customtkinter as ctk
+    from xmnz_tester.gui.main_window import MainWindow
+
     print("Lanzando GUI...")
     ctk.set_appearance_mode("system") # "System", "Light", "Dark"
     ctk.set_default_color_theme("blue")
@@ -20,7 +22,7 @@ if __name__ == "__main__":
     load_dotenv()
 
     try:
-        config = ConfigManager()
+        config = get_config()
         launch_gui()
 
     except Exception as e:
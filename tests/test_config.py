@@ -0,0 +1,60 @@
+import sys
+import types
+import pytest
+from unittest.mock import patch
+
+from xmnz_tester import config as config_module
+from xmnz_tester.config import ConfigManager
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    """Crea un config.yaml mínimo y aísla el singleton y la caché en tmp_path."""
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(ConfigManager, "_instance", None)
+
+    path = tmp_path / "config.yaml"
+    path.write_text("station:\n  id: 'TEST-JIG'\n")
+    return path
+
+
+def test_config_cache_skips_yaml_on_second_load(config_file, monkeypatch):
+    """
+    Test que verifica que la segunda carga usa la caché y no vuelve a parsear el YAML.
+    """
+    assert ConfigManager(config_file).station_id == "TEST-JIG"
+    assert len(list((config_file.parent / "cache").glob("*.pkl"))) == 1
+
+    monkeypatch.setattr(ConfigManager, "_instance", None)
+    with patch.object(config_module.yaml, "load", side_effect=AssertionError("YAML parseado")):
+        assert ConfigManager(config_file).station_id == "TEST-JIG"
+
+
+def test_config_cache_invalidated_when_file_changes(config_file, monkeypatch):
+    """
+    Test que verifica que un cambio en config.yaml invalida la caché anterior.
+    """
+    ConfigManager(config_file)
+
+    config_file.write_text("station:\n  id: 'OTHER-JIG'\n")
+    monkeypatch.setattr(ConfigManager, "_instance", None)
+
+    assert ConfigManager(config_file).station_id == "OTHER-JIG"
+    assert len(list((config_file.parent / "cache").glob("*.pkl"))) == 1
+
+
+def test_frozen_config_used_while_yaml_unchanged(config_file, monkeypatch):
+    """
+    Test que verifica que la configuración congelada se usa mientras config.yaml no cambie.
+    """
+    frozen_path = config_module.freeze_config(config_file, config_file.parent / "_config_frozen.py")
+    frozen = types.ModuleType("xmnz_tester._config_frozen")
+    exec(frozen_path.read_text(), frozen.__dict__)
+    monkeypatch.setitem(sys.modules, "xmnz_tester._config_frozen", frozen)
+
+    with patch.object(config_module.yaml, "load", side_effect=AssertionError("YAML parseado")):
+        assert ConfigManager(config_file).station_id == "TEST-JIG"
+
+    config_file.write_text("station:\n  id: 'OTHER-JIG'\n")
+    monkeypatch.setattr(ConfigManager, "_instance", None)
+    assert ConfigManager(config_file).station_id == "OTHER-JIG"
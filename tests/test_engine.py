@@ -0,0 +1,159 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+
+from xmnz_tester.engine import test_runner
+from xmnz_tester.engine.test_runner import RELAY_STEPS
+
+
+@pytest.fixture
+def config():
+    """Configuración mínima: sin esperas y con todos los pasos habilitados."""
+    config = MagicMock()
+    config.enabled_steps = None
+    config.ui_messages = {}
+    config.stop_on_fail = False
+    config.relay_settle_timeout_s = 0.0
+    config.relay_poll_interval_s = 0.0
+    config.tamper_settle_s = 0.0
+    config.rs485_timeouts = {}
+    config.relay_num_tamper_1 = 1
+    config.relay_num_tamper_2 = 2
+    config.relay_num_vin_power = 3
+    config.relay_num_battery = 4
+    return config
+
+
+@pytest.fixture
+def reports():
+    """Lista donde el callback del runner deja los mensajes (step_id, message, status)."""
+    return []
+
+
+@pytest.fixture
+def make_runner(config, reports):
+    """
+    Crea un TestRunner con controladores falsos y el callback apuntando a 'reports'.
+    La secuencia se resuelve al construirlo: ajustar 'config' antes de llamarlo.
+    """
+    def factory():
+        return test_runner.TestRunner(
+            config_manager=config,
+            relay_controller=MagicMock(),
+            serial_controller=MagicMock(),
+            ua_meter=MagicMock(),
+            ma_meter=MagicMock(),
+            gui_callback=lambda step_id, message, status: reports.append((step_id, message, status)),
+            stop_event=threading.Event()
+        )
+    return factory
+
+
+@pytest.fixture
+def runner(make_runner):
+    return make_runner()
+
+
+def failures(reports):
+    return [message for _, message, status in reports if status == "FAIL"]
+
+
+def test_disconnect_relay_step_fails_if_relay_stays_closed(runner, reports):
+    """
+    Test que verifica que un paso de desconexión falla si el relé sigue cerrado.
+    """
+    runner.relay_controller.get_relay_state.return_value = True
+
+    runner._relay_step(*RELAY_STEPS['test_step_disconnect_battery'])
+
+    runner.relay_controller.set_relay.assert_called_once_with(4, False)
+    assert failures(reports) == ["Fallo al desconectar la batería."]
+    assert runner._failed
+
+
+def test_critical_step_failure_stops_sequence(make_runner, config, reports):
+    """
+    Test que verifica que un paso crítico fallido detiene la secuencia aunque
+    stop_on_fail esté desactivado.
+    """
+    config.enabled_steps = ['test_step_connect_battery', 'test_step_apply_vin']
+    runner = make_runner()
+    runner.relay_controller.get_relay_state.return_value = False
+
+    runner._run_test_steps()
+
+    runner.relay_controller.set_relay.assert_called_once_with(4, True)
+    assert failures(reports) == ["Fallo al conectar la batería."]
+
+
+def test_non_critical_step_failure_continues_sequence(make_runner, config):
+    """
+    Test que verifica que un paso no crítico fallido no detiene la secuencia
+    si stop_on_fail está desactivado.
+    """
+    config.enabled_steps = ['test_step_disconnect_battery', 'test_step_disconnect_vin']
+    runner = make_runner()
+    runner.relay_controller.get_relay_state.return_value = True
+
+    runner._run_test_steps()
+
+    assert runner.relay_controller.set_relay.call_count == 2
+    assert runner._failed
+
+
+@pytest.mark.parametrize("board_mask,states,expected", [
+    (0b0000, {1: False, 2: False}, 0b00),
+    (0b0001, {1: False, 2: True}, 0b11),
+    (0b1011, {1: True, 2: True}, 0b00),
+    (0b0110, {1: True, 3: True}, 0b01),
+])
+def test_wait_relays_returns_mismatch_mask(runner, board_mask, states, expected):
+    """
+    Test que verifica que _wait_relays devuelve solo los relés consultados que no
+    alcanzaron su estado.
+    """
+    runner.relay_controller.get_mask.return_value = board_mask
+
+    assert runner._wait_relays(states) == expected
+
+
+def test_tampers_report_one_failure_per_relay(runner, reports):
+    """
+    Test que verifica que el paso de tampers reporta un FAIL por cada relé que no
+    alcanza su estado en cada combinación.
+    """
+    runner.relay_controller.get_mask.return_value = 0b11
+    runner._update_dut_status = MagicMock(return_value=False)
+
+    runner._test_step_test_tampers()
+
+    assert failures(reports) == [
+        "El relé 1 no alcanzó el estado False.",
+        "El relé 2 no alcanzó el estado False.",
+        "El relé 2 no alcanzó el estado False.",
+        "El relé 1 no alcanzó el estado False.",
+        "El paso de verificación de tampers ha fallado.",
+    ]
+
+
+def test_low_power_without_ack_skips_sleep_steps(make_runner, config, monkeypatch):
+    """
+    Test que verifica que sin confirmación del modo de bajo consumo se omiten la
+    medida en reposo y la espera de despertar.
+    """
+    config.enabled_steps = [
+        'test_step_set_low_power_mode',
+        'test_step_measure_sleep_current',
+        'test_step_wakeup_from_sleep',
+    ]
+    runner = make_runner()
+    runner.serial_controller.send_command.return_value = None
+    sleep = MagicMock()
+    monkeypatch.setattr(test_runner.time, "sleep", sleep)
+
+    runner._run_test_steps()
+
+    assert not runner._low_power_acked
+    runner.ua_meter.get_current_measurement.assert_not_called()
+    runner.serial_controller.wait_for_prompt.assert_not_called()
+    sleep.assert_not_called()
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import MagicMock
+
+from xmnz_tester.hal import ina3221, serial_pool
+from xmnz_tester.hal.ina3221 import PowerMeterINA3221
+from xmnz_tester.hal.rs485 import RS485Controller
+from xmnz_tester.hal.serial_pool import SerialPool
+
+
+@pytest.fixture
+def mock_ina219(monkeypatch):
+    """Sustituye INA219 por un mock y deja vacía la caché de canales antes y después del test."""
+    mock = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+    monkeypatch.setattr(ina3221, "INA219", mock)
+    PowerMeterINA3221.clear_cache()
+    yield mock
+    PowerMeterINA3221.clear_cache()
+
+
+@pytest.fixture
+def mock_serial(monkeypatch):
+    """Sustituye serial.Serial por un mock y deja el pool vacío antes y después del test."""
+    mock = MagicMock(side_effect=lambda *args, **kwargs: MagicMock(is_open=True))
+    monkeypatch.setattr(serial_pool.serial, "Serial", mock)
+    SerialPool.close_all()
+    yield mock
+    SerialPool.close_all()
+
+
+def test_rs485_reuses_pooled_port(mock_serial):
+    """
+    Test que verifica que un segundo controlador reutiliza el puerto ya abierto.
+    """
+    first = RS485Controller(port="/dev/ttyTEST")
+    first.connect()
+    conn = first.serial_conn
+    first.disconnect()
+
+    second = RS485Controller(port="/dev/ttyTEST")
+    second.connect()
+
+    assert second.serial_conn is conn
+    mock_serial.assert_called_once_with("/dev/ttyTEST", 115200, timeout=2.0)
+    conn.close.assert_not_called()
+
+
+def test_serial_pool_rejects_port_in_use(mock_serial):
+    """
+    Test que verifica que un puerto entregado no se entrega dos veces.
+    """
+    SerialPool.acquire("/dev/ttyTEST", 115200, timeout=1.0)
+
+    with pytest.raises(serial_pool.serial.SerialException, match="ya está en uso"):
+        SerialPool.acquire("/dev/ttyTEST", 115200, timeout=1.0)
+
+
+def test_rs485_reopens_port_after_io_error(mock_serial):
+    """
+    Test que verifica que un puerto que falla se cierra, sale del pool y se reabre al reconectar.
+    """
+    controller = RS485Controller(port="/dev/ttyTEST")
+    controller.connect()
+    dead_conn = controller.serial_conn
+    dead_conn.write.side_effect = serial_pool.serial.SerialException("device disconnected")
+    dead_conn.close.side_effect = lambda: setattr(dead_conn, "is_open", False)
+
+    assert controller.send_command("status") is None
+    dead_conn.close.assert_called_once_with()
+
+    controller.disconnect()
+    controller.connect()
+
+    assert controller.serial_conn is not dead_conn
+    assert mock_serial.call_count == 2
+
+
+def test_ina3221_reconfigures_after_read_error(mock_ina219):
+    """
+    Test que verifica que un error de lectura descarta los canales cacheados y el
+    siguiente connect() vuelve a configurar el sensor.
+    """
+    meter = PowerMeterINA3221(i2c_bus=1, i2c_address=0x40, shunt_resistance_ohms=0.1)
+    meter.connect()
+    PowerMeterINA3221(i2c_bus=1, i2c_address=0x40, shunt_resistance_ohms=0.1).connect()
+    assert mock_ina219.call_count == 3
+
+    meter.channels[0].voltage.side_effect = OSError("I2C remote I/O error")
+    with pytest.raises(OSError):
+        meter.read_channel(1)
+
+    meter.connect()
+    assert mock_ina219.call_count == 6
+    meter.channels[0].configure.assert_called_once_with()
@@ -1,40 +1,40 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 
 from xmnz_tester.hal.relays import RelayController
 
-# Usamos el decorador @patch para reemplazar 'pyhid_usb_relay' por un mock
-@patch('xmnz_tester.hal.relays.pyhid_usb_relay')
-def test_relay_connect_and_set_state(mock_hid_relay):
+
+@pytest.fixture(autouse=True)
+def mock_hid_relay(monkeypatch):
+    """Sustituye 'pyhid_usb_relay' por un mock en todos los tests del módulo."""
+    mock = MagicMock()
+    monkeypatch.setattr('xmnz_tester.hal.relays.pyhid_usb_relay', mock)
+    yield mock
+
+
+@pytest.fixture
+def mock_device(mock_hid_relay):
+    """Dispositivo falso que devuelve find()."""
+    device = MagicMock()
+    mock_hid_relay.find.return_value = device
+    return device
+
+
+@pytest.mark.parametrize("relay,state", [(2, True), (3, False)])
+def test_relay_connect_and_set_state(mock_hid_relay, mock_device, relay, state):
     """
     Test que verifica la conexión y el cambio de estado de un relé.
     """
-    # --- 1. Configuración del mock ---
-    # Simulamos que el mock devuelve un dispositivo falso cuando se llama a find()
-    mock_device = MagicMock()
-    mock_hid_relay.find.return_value = mock_device
-
-    # --- 2. Ejecución del código a probar ---
     # Usamos 'with' para que connect() y disconnect() se llamen automáticamente
-    # Pasamos parámetros de ejemplo
     with RelayController(num_relays=4, serial_number="TEST_SN") as controller:
-        # Probamos a encender el relé 2
-        controller.set_relay(2, True)
-
-        # Probamos a apagar el relé 3
-        controller.set_relay(3, False)
+        controller.set_relay(relay, state)
 
-    # --- 3. Verificaciones (Asserts) ---
     # Verificamos que find() fue llamado una vez
     mock_hid_relay.find.assert_called_once_with()
 
-    # Verificamos que set_state() fue llamado correctamente para encender el relé 2
-    mock_device.set_state.assert_any_call(2, True)
+    # Verificamos que set_state() fue llamado correctamente para el relé
+    mock_device.set_state.assert_any_call(relay, state)
 
-    # Verificamos que set_state() fue llamado correctamente para apagar el relé 3
-    mock_device.set_state.assert_any_call(3, False)
-
-@patch('xmnz_tester.hal.relays.pyhid_usb_relay')
 def test_relay_connection_failed(mock_hid_relay):
     """
     Test que verifica que se lanza una excepción si no se encuentra el dispositivo.
@@ -56,4 +56,54 @@ def test_invalid_relay_number():
     controller = RelayController(num_relays=2)
 
     with pytest.raises(ValueError, match="Número de relé inválido: 3"):
-        controller.set_relay(3, True)
\ No newline at end of file
+        controller.set_relay(3, True)
+
+def test_all_off_uses_single_report(mock_device):
+    """
+    Test que verifica que apagar todos los relés se hace con un único informe HID.
+    """
+    controller = RelayController(num_relays=4)
+    controller.connect()
+
+    mock_device.set_state.assert_called_once_with("all", False)
+
+def test_set_mask_only_writes_changed_relays(mock_device):
+    """
+    Test que verifica que set_mask() solo escribe los relés cuyo estado cambia.
+    """
+    mock_device.state = 0b0011  # Relés 1 y 2 encendidos
+
+    controller = RelayController(num_relays=4)
+    controller.relay_device = mock_device
+
+    controller.set_mask(0b0110)  # Relés 2 y 3 encendidos
+
+    assert mock_device.set_state.call_count == 2
+    mock_device.set_state.assert_any_call(1, False)
+    mock_device.set_state.assert_any_call(3, True)
+
+def test_set_relays_reads_state_once(mock_device):
+    """
+    Test que verifica que set_relays() lee la placa una vez y solo escribe los relés que cambian.
+    """
+    mock_device.state = 0b0001  # Relé 1 encendido
+
+    controller = RelayController(num_relays=4)
+    controller.relay_device = mock_device
+
+    controller.set_relays({1: True, 2: True, 4: False})
+
+    mock_device.get_state.assert_called_once()
+    mock_device.set_state.assert_called_once_with(2, True)
+
+def test_relay_writes_use_cached_state(mock_device):
+    """
+    Test que verifica que, tras una escritura, el siguiente cambio no vuelve a leer la placa.
+    """
+    controller = RelayController(num_relays=4)
+    controller.connect()  # all_off() deja la caché en 0
+    controller.set_relays({1: True, 3: True})
+
+    mock_device.get_state.assert_not_called()
+    assert controller.get_relay_state(3, from_cache=True) is True
+    assert controller.get_relay_state(2, from_cache=True) is False
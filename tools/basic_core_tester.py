@@ -1,7 +1,10 @@
+import asyncio
+import concurrent.futures
 import customtkinter as ctk
+import math
 import threading
 import time
-from typing import Optional
+from typing import Optional, Tuple
 
 # We use the BLU-Meter API library
 # Make sure it's installed: pip install blu-api-python
@@ -17,6 +20,10 @@ VOLTAGE_MV = 4000
 WAIT_FOR_SLEEP_S = 12
 # Maximum current consumption threshold in sleep mode.
 SLEEP_CURRENT_THRESHOLD_UA = 30.0
+# Samples averaged per measurement (same as blu_meter.measurement_samples in config.yaml)
+MEASUREMENT_SAMPLES = 100
+# Upper bound for collecting those samples.
+MEASUREMENT_TIMEOUT_S = 0.25
 
 
 class SimpleBLUMeter:
@@ -71,18 +78,36 @@ class SimpleBLUMeter:
 
     def get_current_measurement(self) -> Optional[float]:
         """Takes a burst of measurements and returns the average in microamperes (uA)."""
+        stats = self.get_current_stats()
+        return stats[0] if stats else None
+
+    def get_current_stats(self) -> Optional[Tuple[float, float]]:
+        """Takes a burst of measurements and returns (mean, standard deviation) in microamperes (uA)."""
         if not self.is_connected:
             return None
         try:
             self.device.start_measuring()
-            time.sleep(0.2) # Capture for 200ms
-            data = self.device.get_data()
+            # Poll until enough samples arrive instead of always waiting the worst case.
+            # Mean and variance are accumulated as samples arrive (Welford), without keeping them.
+            count = 0
+            mean = 0.0
+            m2 = 0.0
+            deadline = time.monotonic() + MEASUREMENT_TIMEOUT_S
+            while count < MEASUREMENT_SAMPLES and time.monotonic() < deadline:
+                data = self.device.get_data()
+                if data:
+                    new_samples, _ = self.device.get_samples(data)
+                    for sample in new_samples:
+                        count += 1
+                        delta = sample - mean
+                        mean += delta / count
+                        m2 += delta * (sample - mean)
+                else:
+                    time.sleep(0.002)
             self.device.stop_measuring()
 
-            if data:
-                samples, _ = self.device.get_samples(data)
-                if samples:
-                    return sum(samples) / len(samples)
+            if count:
+                return mean, math.sqrt(m2 / count)
             return None
         except Exception as e:
             print(f"Error during measurement: {e}")
@@ -104,7 +129,7 @@ class App(ctk.CTk):
         self.title_label = ctk.CTkLabel(self, text="Current consumption test - Phase 1", font=ctk.CTkFont(size=20, weight="bold"))
         self.title_label.grid(row=0, column=0, padx=20, pady=(20, 10))
 
-        self.start_button = ctk.CTkButton(self, text="Start test", command=self.start_test_thread)
+        self.start_button = ctk.CTkButton(self, text="Start test", command=self.start_test)
         self.start_button.grid(row=1, column=0, padx=20, pady=10, ipady=10)
 
         self.status_frame = ctk.CTkFrame(self)
@@ -122,72 +147,99 @@ class App(ctk.CTk):
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.blu_meter = SimpleBLUMeter()
-        self.test_thread = None
+        self.test_future: Optional[concurrent.futures.Future] = None
+
+        # Dedicated asyncio loop for the test logic, so waits never touch the Tk mainloop
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
 
-    def start_test_thread(self):
-        """Starts the test logic in a separate thread."""
+    def start_test(self):
+        """Schedules the test coroutine on the asyncio loop thread."""
         self.start_button.configure(state="disabled", text="Testing...")
-        self.test_thread = threading.Thread(target=self.run_test_logic, daemon=True)
-        self.test_thread.start()
+        self.test_future = asyncio.run_coroutine_threadsafe(self.run_test_logic(), self.loop)
 
-    def run_test_logic(self):
+    async def run_test_logic(self):
         """Sequence of steps for the core test."""
         # 1. Reset GUI
         self.update_ui(instruction="Connecting to BLU939 meter...", result="PENDING", color="gray")
 
         # 2. Connect to meter
         if not self.blu_meter.connect():
-            self.update_ui(instruction="Error: Could not connect to BLU939. Check connection and restart.", result="ERROR", color="red")
-            self.start_button.configure(state="normal", text="Start Core Test")
+            self.update_ui(instruction="Error: Could not connect to BLU939. Check connection and restart.", result="ERROR", color="red",
+                           button_text="Start Core Test")
             return
 
         # 3. Apply power
         self.update_ui(instruction="Power ON. The DUT is running its self-test.\n\nPlease wait...")
         if not self.blu_meter.set_voltage(VOLTAGE_MV):
-            self.update_ui(instruction="Error activating BLU939 source.", result="ERROR", color="red")
             self.blu_meter.disconnect()
-            self.start_button.configure(state="normal", text="Start Core Test")
+            self.update_ui(instruction="Error activating BLU939 source.", result="ERROR", color="red",
+                           button_text="Start Core Test")
             return
 
-        # 4. Wait for DUT to enter sleep mode
-        time.sleep(WAIT_FOR_SLEEP_S)
+        # 4. Wait for DUT to enter sleep mode (cancellable, unlike a blocking sleep)
+        await asyncio.sleep(WAIT_FOR_SLEEP_S)
 
         # 5. Measure current consumption
         self.update_ui(instruction="Measuring sleep mode current consumption...")
-        sleep_current = self.blu_meter.get_current_measurement()
+        stats = self.blu_meter.get_current_stats()
 
         # 6. Disconnect power
         self.blu_meter.disconnect()
 
         # 7. Evaluate and display results
-        if sleep_current is None:
-            self.update_ui(instruction="Could not perform current consumption measurement.", result="FAIL", color="red")
+        if stats is None:
+            self.update_ui(instruction="Could not perform current consumption measurement.", result="FAIL", color="red",
+                           button_text="Start Core Test")
         else:
-            self.current_label.configure(text=f"Sleep Consumption: {sleep_current:.2f} µA")
+            sleep_current, noise = stats
             if sleep_current < SLEEP_CURRENT_THRESHOLD_UA:
                 msg = f"Consumption OK ({sleep_current:.2f} µA).\n\nPhase 1 test passed. You can now proceed with the manual Phase 2 test (power with 12V, test tampers and relay)."
-                self.update_ui(instruction=msg, result="PASS", color="green")
+                self.update_ui(instruction=msg, result="PASS", color="green", current=sleep_current, noise=noise,
+                               button_text="Start Core Test")
             else:
                 msg = f"Consumption too high ({sleep_current:.2f} µA). The limit is {SLEEP_CURRENT_THRESHOLD_UA} µA."
-                self.update_ui(instruction=msg, result="FAIL", color="red")
-
-        self.start_button.configure(state="normal", text="Start Core Test")
-
-    def update_ui(self, instruction=None, result=None, color=None, current=None):
-        """Helper function to update the GUI from the test thread."""
-        if instruction is not None:
-            self.instruction_label.configure(text=instruction)
-        if result is not None:
-            self.result_label.configure(text=f"RESULT: {result}")
-        if color is not None:
-            self.result_label.configure(text_color=color)
-        if current is not None:
-            self.current_label.configure(text=f"Sleep Consumption: {current:.2f} µA")
+                self.update_ui(instruction=msg, result="FAIL", color="red", current=sleep_current, noise=noise,
+                               button_text="Start Core Test")
+
+    def update_ui(self, instruction=None, result=None, color=None, current=None, noise=None, button_text=None):
+        """
+        Helper function to update the GUI from the test thread.
+
+        Only builds the payload; all widget changes are applied together on the Tk thread.
+        """
+        payload = {"instruction": instruction, "result": result, "color": color,
+                   "current": current, "noise": noise, "button_text": button_text}
+        self.after(0, self._apply_update, payload)
+
+    def _apply_update(self, payload: dict):
+        """Applies an update_ui() payload. Runs on the Tk thread."""
+        if payload["instruction"] is not None:
+            self.instruction_label.configure(text=payload["instruction"])
+        if payload["result"] is not None or payload["color"] is not None:
+            result_options = {}
+            if payload["result"] is not None:
+                result_options["text"] = f"RESULT: {payload['result']}"
+            if payload["color"] is not None:
+                result_options["text_color"] = payload["color"]
+            self.result_label.configure(**result_options)
+        if payload["current"] is not None:
+            text = f"Sleep Consumption: {payload['current']:.2f} µA"
+            if payload["noise"] is not None:
+                text += f" (σ {payload['noise']:.2f} µA)"
+            self.current_label.configure(text=text)
+        if payload["button_text"] is not None:
+            self.start_button.configure(state="normal", text=payload["button_text"])
 
     def on_closing(self):
         """Ensures safe disconnection when closing the window."""
+        if self.test_future and not self.test_future.done():
+            # Abort the pending wait and give the coroutine a moment to unwind
+            self.test_future.cancel()
+            concurrent.futures.wait([self.test_future], timeout=1)
         if self.blu_meter.is_connected:
             self.blu_meter.disconnect()
+        self.loop.call_soon_threadsafe(self.loop.stop)
         self.destroy()
 
 if __name__ == "__main__":
@@ -1,38 +1,306 @@
+import bisect
+import concurrent.futures
 import json
-from xmnz_tester.config import ConfigManager
+import sys
+
+try:
+    import readline
+except ImportError:  # Windows sin pyreadline: se usa input() sin autocompletado
+    readline = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from dataclasses import dataclass
+from xmnz_tester.config import get_config
 from xmnz_tester.hal.relays import RelayController
 from xmnz_tester.hal.ina3221 import PowerMeterINA3221
 from xmnz_tester.hal.meter_factory import MeterFactory
+from xmnz_tester.hal.meter_interface import CurrentMeterInterface
 from xmnz_tester.hal.rs485 import RS485Controller
 
-# Mapeo de nombres de relés a sus números para facilitar el uso
-# Se cargará desde la configuración
-RELAY_NAME_MAP = {}
+
+@dataclass
+class CliContext:
+    """Controladores y mapas que comparten los manejadores de comandos."""
+    relay_controller: RelayController
+    ua_meter: CurrentMeterInterface
+    ina_meter: PowerMeterINA3221
+    rs485_controller: RS485Controller
+    # Número de relé -> nombre (en minúsculas), para mostrarlo en los mensajes
+    relay_name_by_num: dict
+    # Nombre o número en texto -> número de relé, precalculado al arrancar
+    relay_lookup: dict
+
+
+class OutputBuffer:
+    """
+    Acumula la salida de un comando y la escribe de una vez con flush().
+    Así las escrituras a la consola no caen dentro de las ventanas de medida.
+    """
+
+    def __init__(self):
+        self.buf = []
+
+    def __call__(self, *args):
+        self.buf.append(" ".join(map(str, args)))
+
+    def flush(self):
+        if self.buf:
+            sys.stdout.write("\n".join(self.buf) + "\n")
+            self.buf.clear()
+        sys.stdout.flush()
+
+
+out = OutputBuffer()
+
+
+MENU_TEXT = "\n".join([
+    "\n--- Menú de test de hardware ---",
+    "Comandos de Relé:",
+    "  relay on <id>   - Encender un relé (id: num, nombre, lista o 'all')",
+    "                                     (ej. 'relay on connect_battery' o 'relay on 1,3')",
+    "  relay off <id>  - Apagar un relé (id: num, nombre, lista o 'all')",
+    "  relay state <num/nombre> - Consultar estado de un relé",
+    "  all_off                   - Apagar todos los relés",
+    "\nComandos de puerto serie (al DUT):",
+    "  serial <comando>            - Enviar comando al DUT y ver la respuesta",
+    "                                (ej: serial GETSTATUS)",
+    "\nComandos de medidor de potencia (uA meter):",
+    "  power on                  - Habilitar salida de 3.7V del medidor uA",
+    "  power off                 - Deshabilitar salida de 3.7V",
+    "  setvoltage ua             - Configurar y activar y voltaje de salida manual",
+    "  measure ua                - Realizar una medición de corriente (uA)",
+    "\nComandos de medidor de activo (INA3221):",
+    "  measure ma [canal]        - Medir un canal del INA3221, o todos si se omite (ej: 'measure ma 1')",
+    "\nOtros:",
+    "  status                    - Mostrar estado de los dispositivos",
+    "  help                      - Mostrar este menú",
+    "  exit                      - Salir de la aplicación",
+    "---------------------------------",
+]) + "\n"
+
 
 def print_menu():
-    """Imprime el menú de comandos disponibles."""
-    print("\n--- Menú de test de hardware ---")
-    print("Comandos de Relé:")
-    print("  relay on <id>   - Encender un relé (id: num, nombre o 'all')")
-    print("                                     (ej. 'relay on connect_battery')")
-    print("  relay off <id>  - Apagar un relé (id: num, nombre o 'all')")
-    print("  relay state <num/nombre> - Consultar estado de un relé")
-    print("  all_off                   - Apagar todos los relés")
-    print("\nComandos de puerto serie (al DUT):")
-    print("  serial <comando>            - Enviar comando al DUT y ver la respuesta")
-    print("                                (ej: serial GETSTATUS)")
-    print("\nComandos de medidor de potencia (uA meter):")
-    print("  power on                  - Habilitar salida de 3.7V del medidor uA")
-    print("  power off                 - Deshabilitar salida de 3.7V")
-    print("  setvoltage ua             - Configurar y activar y voltaje de salida manual")
-    print("  measure ua                - Realizar una medición de corriente (uA)")
-    print("\nComandos de medidor de activo (INA3221):")
-    print("  measure ma <canal>        - Medir un canal del INA3221 (ej: 'measure ma 1')")
-    print("\nOtros:")
-    print("  status                    - Mostrar estado de los dispositivos")
-    print("  help                      - Mostrar este menú")
-    print("  exit                      - Salir de la aplicación")
-    print("---------------------------------")
+    """Imprime el menú de comandos disponibles (texto precalculado, una sola escritura)."""
+    sys.stdout.write(MENU_TEXT)
+    sys.stdout.flush()
+
+
+def _json_loads(text: str):
+    """Parsea JSON con orjson si está disponible (json.JSONDecodeError es un ValueError en ambos)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_pretty(data) -> str:
+    """Formatea JSON con sangría de 2 espacios."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2)
+
+
+# --- Manejadores de comandos ---
+def _cmd_help(parts: list, ctx: CliContext):
+    print_menu()
+
+
+def _cmd_relay(parts: list, ctx: CliContext):
+    action = parts[1]
+    target = parts[2]
+
+    if target == "all":
+        if action == "on":
+            out("Encendiendo todos los relés...")
+            ctx.relay_controller.all_on()
+        elif action == "off":
+            out("Apagando todos los relés...")
+            ctx.relay_controller.all_off()
+        else:
+            out("Error: La acción 'state' no es compatible con 'all'.")
+    elif "," in target:
+        # Varios relés en un mismo comando: se aplican de una vez (una sola lectura de la placa)
+        try:
+            relay_nums = [ctx.relay_lookup[name] for name in target.split(",")]
+
+            if action == "on":
+                ctx.relay_controller.set_relays(dict.fromkeys(relay_nums, True))
+                out(f"Relés {target} encendidos.")
+            elif action == "off":
+                ctx.relay_controller.set_relays(dict.fromkeys(relay_nums, False))
+                out(f"Relés {target} apagados.")
+            else:
+                out("Error: La acción 'state' no es compatible con listas de relés.")
+        except (ValueError, KeyError):
+            out(f"Error: Lista de relés '{target}' no válida.")
+    else:
+        relay_num = ctx.relay_lookup.get(target)
+        if relay_num is None:
+            out(f"Error: Identificador de relé '{target}' no válido.")
+            return
+        try:
+            if action == "on":
+                ctx.relay_controller.set_relay(relay_num, True)
+                out(f"Relé {relay_num} ({ctx.relay_name_by_num.get(relay_num, '-')}) encendido.")
+            elif action == "off":
+                ctx.relay_controller.set_relay(relay_num, False)
+                out(f"Relé {relay_num} ({ctx.relay_name_by_num.get(relay_num, '-')}) apagado.")
+            elif action == "state":
+                state = ctx.relay_controller.get_relay_state(relay_num)
+                out(f"Resultado: El relé {relay_num} ({ctx.relay_name_by_num.get(relay_num, '-')}) está {'ON' if state else 'OFF'}.")
+        except (ValueError, KeyError):
+            out(f"Error: Identificador de relé '{target}' no válido.")
+
+
+def _cmd_all_off(parts: list, ctx: CliContext):
+    out("Apagando todos los relés...")
+    ctx.relay_controller.all_off()
+
+
+def _cmd_serial(parts: list, ctx: CliContext):
+    if len(parts) < 2:
+        out("Error: Debes especificar un comando a enviar. Ej: 'serial GETSTATUS'")
+        return
+
+    dut_command = " ".join(parts[1:])
+
+    response_lines = ctx.rs485_controller.send_command(dut_command)
+
+    if response_lines is not None:
+        if len(response_lines) == 1:
+            line = response_lines[0]
+            try:
+                out("Respuesta (JSON formateado):\n" + _json_pretty(_json_loads(line)))
+            except ValueError:
+                out("Respuesta (texto):\n" + line)
+        else:
+            out("Respuesta (multilínea):\n" + "\n".join(response_lines))
+    else:
+        out("No se obtuvo una respuesta completa del dispositivo.")
+
+
+def _cmd_power(parts: list, ctx: CliContext):
+    if parts[1] == "on":
+        ctx.ua_meter.set_source_enabled(True)
+    elif parts[1] == "off":
+        ctx.ua_meter.set_source_enabled(False)
+
+
+def _cmd_setvoltage(parts: list, ctx: CliContext):
+    if len(parts) < 2:
+        out("Error: Debes especificar el voltaje en milivoltios. Ej: setvoltage 3300")
+        return
+    try:
+        mv = int(parts[1])
+        out(f"Configurando voltaje de salida a {mv} mV...")
+        success = ctx.ua_meter.set_voltage(mv)
+        if success:
+            out("Voltaje configurado y salida activada.")
+        else:
+            out("Fallo al configurar el voltaje. Revisa los logs para más detalles.")
+    except ValueError:
+        out("Error: El voltaje debe ser un número entero (ej: 3300).")
+
+
+def _cmd_measure(parts: list, ctx: CliContext):
+    # --- Medidor de uA ---
+    if parts[1] == "ua":
+        out("Midiendo corriente (puede tardar un momento)...")
+        out.flush()
+        current = ctx.ua_meter.get_current_measurement()
+        if current is not None:
+            out(f"Resultado: {current:.2f} uA")
+        else:
+            out("Error: No se pudo obtener la medición.")
+
+    # --- Medidor INA3221 ---
+    elif parts[1] == "ma":
+        # Sin canal se leen los tres de una pasada
+        channels = [int(parts[2])] if len(parts) > 2 else None
+        readings = ctx.ina_meter.read_channels(channels)
+        for channel, data in readings.items():
+            out(f"Canal {channel} del INA3221:")
+            if data:
+                out(f"  - Voltaje: {data['bus_voltage_V']:.3f} V")
+                out(f"  - Corriente: {data['current_mA']:.2f} mA")
+                out(f"  - Potencia: {data['power_mW']:.2f} mW")
+            else:
+                out("  Error: No se pudo leer el canal.")
+
+    else:
+        _cmd_unknown(parts, ctx)
+
+
+def _cmd_status(parts: list, ctx: CliContext):
+    out("\n--- Estado actual del hardware ---")
+    out("Medidor uA:", ctx.ua_meter.get_info())
+    # Una sola petición HID para el estado de todos los relés
+    mask = ctx.relay_controller.get_mask()
+    for relay_num, relay_name in sorted(ctx.relay_name_by_num.items()):
+        state = mask >> (relay_num - 1) & 1
+        out(f"Relé {relay_num} ({relay_name}): {'ON' if state else 'OFF'}")
+
+
+def _cmd_unknown(parts: list, ctx: CliContext):
+    out(f"Comando '{parts[0]}' desconocido. Escribe 'help' para ver las opciones.")
+
+
+# Órdenes completas que ofrece el autocompletado (los nombres de relé se añaden al arrancar)
+COMPLETION_COMMANDS = (
+    "relay on ", "relay off ", "relay state ", "all_off", "serial ", "power on", "power off",
+    "setvoltage ", "measure ua", "measure ma ", "status", "help", "exit",
+)
+
+
+def _setup_completion(relay_names):
+    """
+    Activa el historial y el autocompletado con TAB de readline.
+
+    Se completa la línea entera contra una tupla ordenada de órdenes construida una sola
+    vez; cada consulta es una búsqueda binaria del prefijo.
+    """
+    if readline is None:
+        return
+
+    candidates = set(COMPLETION_COMMANDS)
+    for action in ("on", "off", "state"):
+        candidates.update(f"relay {action} {name}" for name in relay_names)
+    candidates = tuple(sorted(candidates))
+
+    def completer(text: str, state: int):
+        prefix = readline.get_line_buffer()[:readline.get_endidx()].lower()
+        start = bisect.bisect_left(candidates, prefix)
+        matches = []
+        for candidate in candidates[start:]:
+            if not candidate.startswith(prefix):
+                break
+            matches.append(candidate)
+        if state >= len(matches):
+            return None
+        # readline sustituye solo la palabra actual: se devuelve la parte desde su inicio
+        return matches[state][len(prefix) - len(text):]
+
+    readline.set_completer_delims(" ")
+    readline.set_completer(completer)
+    readline.parse_and_bind("tab: complete")
+
+
+# Tabla de despacho: comando -> manejador(parts, ctx). 'exit'/'quit' se gestionan en el bucle.
+COMMANDS = {
+    "help": _cmd_help,
+    "menu": _cmd_help,
+    "relay": _cmd_relay,
+    "all_off": _cmd_all_off,
+    "serial": _cmd_serial,
+    "power": _cmd_power,
+    "setvoltage": _cmd_setvoltage,
+    "measure": _cmd_measure,
+    "status": _cmd_status,
+}
+EXIT_COMMANDS = ("exit", "quit")
+
 
 def main():
     """Función principal del tester interactivo."""
@@ -46,174 +314,76 @@ def main():
 
     # --- Cargar configuración e inicializar hardware ---
     try:
-        config = ConfigManager()
+        config = get_config()
 
-        global RELAY_NAME_MAP
-        RELAY_NAME_MAP = config.relay_map
+        # Las órdenes se pasan a minúsculas, así que las claves también
+        relay_name_map = {sys.intern(name.lower()): num for name, num in config.relay_map.items()}
 
-        print("Conectando a la placa de relés...")
         relay_controller = RelayController(
-            num_relays=len(RELAY_NAME_MAP),
+            num_relays=len(relay_name_map),
             serial_number=config.relay_serial_number
         )
-        relay_controller.connect()
-
-        print("\nConectando al medidor de uA...")
-        ua_meter_config = config.hardware.get("power_meters", {}).get("ua_meter", {})
-        ua_meter = MeterFactory.create_ua_meter(ua_meter_config)
-        if not ua_meter or not ua_meter.connect():
-            raise ConnectionError("No se pudo conectar al medidor de uA.")
-        print(f"Medidor de uA ({ua_meter.get_info()['type']}) conectado.")
-
-        print("\nConectando al medidor INA3221...")
+        ua_meter = MeterFactory.create_ua_meter(config.ua_meter_config)
+        if not ua_meter:
+            raise ConnectionError("No se pudo crear el medidor de uA.")
         ina_meter = PowerMeterINA3221(**config.ina3221_config)
-        ina_meter.connect()
-
-        print("\nConectando al puerto serie...")
         rs485_controller = RS485Controller(
             port=config.rs485_port,
-            baud_rate=config.rs485_baud_rate
+            baud_rate=config.rs485_baud_rate,
+            low_latency=config.rs485_latency_ms is not None,
+            latency_ms=config.rs485_latency_ms or 1
         )
-        rs485_controller.connect()
+
+        # Cada conexión pasa casi todo el tiempo esperando al bus USB/I2C, así que
+        # se lanzan a la vez: la inicialización tarda lo que la más lenta.
+        print("Conectando relés, medidor de uA, INA3221 y puerto serie...")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            relay_future = executor.submit(relay_controller.connect)
+            ua_future = executor.submit(ua_meter.connect)
+            ina_future = executor.submit(ina_meter.connect)
+            rs485_future = executor.submit(rs485_controller.connect)
+            # result() relanza la primera excepción en el orden habitual de conexión
+            relay_future.result()
+            if not ua_future.result():
+                raise ConnectionError("No se pudo conectar al medidor de uA.")
+            print(f"Medidor de uA ({ua_meter.get_info()['type']}) conectado.")
+            ina_future.result()
+            rs485_future.result()
 
     except Exception as e:
         print(f"\nERROR CRÍTICO durante la inicialización: {e}")
         print("Asegúrate de que el hardware está conectado y 'config.yaml' es correcto.")
         return
 
+    relay_lookup = {str(num): num for num in range(1, len(relay_name_map) + 1)}
+    relay_lookup.update(relay_name_map)
+    relay_name_by_num = {num: name for name, num in relay_name_map.items()}
+    ctx = CliContext(relay_controller, ua_meter, ina_meter, rs485_controller, relay_name_by_num, relay_lookup)
+
+    _setup_completion(relay_name_map)
+
     # --- Bucle principal de comandos ---
     print_menu()
     while True:
         try:
             cmd_input = input("\n> Introduce un comando: ").strip().lower()
-            parts = cmd_input.split()
+            # Ningún comando usa más de 3 campos salvo 'serial', que vuelve a unir el resto
+            parts = cmd_input.split(None, 3)
             if not parts:
                 continue
 
-            command = parts[0]
-
-            if command == "quit" or command == "exit":
+            if parts[0] in EXIT_COMMANDS:
                 break
 
-            elif command == "menu" or command == "help":
-                print_menu()
-
-            # --- Lógica de relés ---
-            elif command == "relay":
-                action = parts[1]
-                target = parts[2]
-
-                if target == "all":
-                    if action == "on":
-                        print("Encendiendo todos los relés...")
-                        relay_controller.all_on()
-                    elif action == "off":
-                        print("Apagando todos los relés...")
-                        relay_controller.all_off()
-                    else:
-                        print("Error: La acción 'state' no es compatible con 'all'.")
-                else:
-                    try:
-                        relay_num = RELAY_NAME_MAP.get(target, target)
-                        relay_num = int(relay_num)
-
-                        if action == "on":
-                            relay_controller.set_relay(relay_num, True)
-                            print(f"Relé {relay_num} ({target}) encendido.")
-                        elif action == "off":
-                            relay_controller.set_relay(relay_num, False)
-                            print(f"Relé {relay_num} ({target}) apagado.")
-                        elif action == "state":
-                            state = relay_controller.get_relay_state(relay_num)
-                            print(f"Resultado: El relé {relay_num} ({target}) está {'ON' if state else 'OFF'}.")
-                    except (ValueError, KeyError):
-                        print(f"Error: Identificador de relé '{target}' no válido.")
-
-            elif command == "all_off":
-                print("Apagando todos los relés...")
-                relay_controller.all_off()
-            # --- Lógica de puerto serie ---
-            elif command == "serial":
-                if len(parts) < 2:
-                    print("Error: Debes especificar un comando a enviar. Ej: 'serial GETSTATUS'")
-                    continue
-
-                dut_command = " ".join(parts[1:])
-
-                response_lines = rs485_controller.send_command(dut_command)
-
-                if response_lines is not None:
-                    if len(response_lines) == 1:
-                        try:
-                            json_response = json.loads(response_lines[0])
-                            print("Respuesta (JSON formateado):")
-                            print(json.dumps(json_response, indent=2))
-                        except json.JSONDecodeError:
-                            print("Respuesta (texto):")
-                            print(response_lines[0])
-                        print("Respuesta (multilínea):")
-                        for line in response_lines:
-                            print(line)
-                else:
-                    print("No se obtuvo una respuesta completa del dispositivo.")
-
-            # --- Lógica del medidor de uA ---
-            elif command == "power":
-                if parts[1] == "on":
-                    ua_meter.set_source_enabled(True)
-                elif parts[1] == "off":
-                    ua_meter.set_source_enabled(False)
-
-            elif command == "setvoltage": # <-- NUEVO BLOQUE
-                if len(parts) < 2:
-                    print("Error: Debes especificar el voltaje en milivoltios. Ej: setvoltage 3300")
-                    continue
-                try:
-                    mv = int(parts[1])
-                    print(f"Configurando voltaje de salida a {mv} mV...")
-                    success = ua_meter.set_voltage(mv)
-                    if success:
-                        print("Voltaje configurado y salida activada.")
-                    else:
-                        print("Fallo al configurar el voltaje. Revisa los logs para más detalles.")
-                except ValueError:
-                    print("Error: El voltaje debe ser un número entero (ej: 3300).")
-
-            elif command == "measure" and parts[1] == "ua":
-                print("Midiendo corriente (puede tardar un momento)...")
-                current = ua_meter.get_current_measurement()
-                if current is not None:
-                    print(f"Resultado: {current:.2f} uA")
-                else:
-                    print("Error: No se pudo obtener la medición.")
-
-            # --- Lógica del medidor INA3221 ---
-            elif command == "measure" and parts[1] == "ma":
-                channel = int(parts[2])
-                print(f"Midiendo canal {channel} del INA3221...")
-                data = ina_meter.read_channel(channel)
-                if data:
-                    print(f"  - Voltaje: {data['bus_voltage_V']:.3f} V")
-                    print(f"  - Corriente: {data['current_mA']:.2f} mA")
-                    print(f"  - Potencia: {data['power_mW']:.2f} mW")
-                else:
-                    print("Error: No se pudo leer el canal.")
-
-            elif command == "status":
-                print("\n--- Estado actual del hardware ---")
-                print("Medidor uA:", ua_meter.get_info())
-                for relay_id, relay_name in RELAY_NAME_MAP.items():
-                    state = relay_controller.get_relay_state(relay_id)
-                    print(f"Relé {relay_id} ({RELAY_NAME_MAP.get(relay_id, relay_id)}): {'ON' if state else 'OFF'}")
-
-
-            else:
-                print(f"Comando '{command}' desconocido. Escribe 'help' para ver las opciones.")
+            COMMANDS.get(parts[0], _cmd_unknown)(parts, ctx)
 
         except (IndexError, ValueError) as e:
-            print(f"Error en el comando: {e}. Revisa la sintaxis. Escribe 'help' para ayuda.")
+            out(f"Error en el comando: {e}. Revisa la sintaxis. Escribe 'help' para ayuda.")
         except Exception as e:
-            print(f"Ha ocurrido un error inesperado: {e}")
+            out(f"Ha ocurrido un error inesperado: {e}")
+        finally:
+            # Punto de sincronización: se vuelca la salida antes de pedir el siguiente comando
+            out.flush()
 
 
     # --- Desconexión segura ---
@@ -226,4 +396,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,30 @@
 import yaml
+import argparse
+import functools
+import hashlib
+import pickle
+import pprint
+import sys
+import threading
 from pathlib import Path
 from typing import Dict, Any, List
 import os
 
+# Parser de libyaml (C) si está disponible; si no, el parser puro de PyYAML
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Directorio donde se guarda la copia serializada de config.yaml para acelerar el arranque
+CACHE_DIR = Path.home() / ".cache" / "xmnz_tester"
+
+# Módulo generado con `python -m xmnz_tester.config freeze` (configuración ya resuelta)
+FROZEN_CONFIG_PATH = Path(__file__).with_name("_config_frozen.py")
+
+# Protege solo la primera construcción del singleton; después el acceso no toma el lock
+_instance_lock = threading.Lock()
+
 # TODO: ¿Gestionar defaults en outro lado?
 class ConfigManager:
     """
@@ -13,111 +35,207 @@ class ConfigManager:
 
     def __new__(cls, *args, **kwargs):
         # El patrón Singleton asegura que solo exista una instancia de esta clase.
-        if not cls._instance:
-            cls._instance = super(ConfigManager, cls).__new__(cls)
+        if cls._instance is None:
+            with _instance_lock:
+                if cls._instance is None:
+                    cls._instance = super(ConfigManager, cls).__new__(cls)
         return cls._instance
 
     def __init__(self, config_path: Path = Path("config.yaml")):
         # El __init__ se ejecutará solo la primera vez que se cree la instancia.
         if not hasattr(self, '_config'):
-            self._config_path = config_path
-            self._config = self._load_config()
+            with _instance_lock:
+                if not hasattr(self, '_config'):
+                    self._config_path = config_path
+                    self._config = self._load_config()
 
     def _load_config(self) -> dict:
-        """Carga el fichero de configuración YAML."""
-        print(f"⚙Cargando configuración desde {self._config_path}")
+        """
+        Carga el fichero de configuración YAML.
+
+        Si existe una copia en caché generada a partir de la misma versión del
+        fichero (mismo mtime y tamaño), se carga directamente sin parsear el YAML.
+        Si además se ha congelado la configuración en `_config_frozen.py` y sigue
+        correspondiendo a config.yaml (o este no existe), se usa esa sin leer nada.
+        """
         try:
-            with open(self._config_path, 'r') as f:
-                return yaml.safe_load(f)
+            stat = os.stat(self._config_path)
         except FileNotFoundError:
+            stat = None
+
+        frozen = self._load_frozen_config(stat)
+        if frozen is not None:
+            print(f"⚙Usando configuración congelada en {FROZEN_CONFIG_PATH.name}")
+            return frozen
+
+        print(f"⚙Cargando configuración desde {self._config_path}")
+        if stat is None:
             print(f"ERROR: Fichero de configuración no encontrado en '{self._config_path}'")
-            raise
+            raise FileNotFoundError(f"No existe el fichero de configuración '{self._config_path}'")
+
+        cache_path = self._cache_path(stat)
+        config = self._read_cache(cache_path)
+        if config is not None:
+            return config
+
+        try:
+            with open(self._config_path, 'r') as f:
+                config = yaml.load(f, Loader=SafeLoader)
         except yaml.YAMLError as e:
             print(f"ERROR: El fichero '{self._config_path}' tiene un formato incorrecto: {e}")
             raise
 
+        self._write_cache(cache_path, config)
+        return config
+
+    @staticmethod
+    def _load_frozen_config(stat: os.stat_result | None) -> dict | None:
+        """
+        Devuelve la configuración congelada si existe y corresponde a la versión
+        actual de config.yaml (mismo mtime y tamaño), o None en caso contrario.
+        """
+        try:
+            from . import _config_frozen as frozen
+        except ImportError:
+            return None
+
+        if stat is not None and (frozen.SOURCE_MTIME_NS, frozen.SOURCE_SIZE) != (stat.st_mtime_ns, stat.st_size):
+            print("AVISO: config.yaml ha cambiado desde que se congeló. Se ignora _config_frozen.py.")
+            return None
+        return frozen.CONFIG
+
+    def _cache_path(self, stat: os.stat_result) -> Path:
+        """Ruta de la caché para la versión actual del fichero (ruta + mtime + tamaño)."""
+        path_digest = hashlib.sha1(str(Path(self._config_path).resolve()).encode('utf-8')).hexdigest()[:12]
+        return CACHE_DIR / f"config.{path_digest}.{stat.st_mtime_ns}.{stat.st_size}.pkl"
+
+    @staticmethod
+    def _read_cache(cache_path: Path) -> dict | None:
+        """Devuelve la configuración cacheada, o None si no existe o no es válida."""
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"AVISO: Caché de configuración inválida ({e}). Se volverá a generar.")
+            return None
+
+    @staticmethod
+    def _write_cache(cache_path: Path, config: dict):
+        """Guarda la configuración de forma atómica y elimina las cachés obsoletas del mismo fichero."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            prefix = cache_path.name.split('.')[1]
+            for old_cache in cache_path.parent.glob(f"config.{prefix}.*.pkl"):
+                old_cache.unlink(missing_ok=True)
+
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(config, f, protocol=5)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            # La caché es solo una optimización: un fallo aquí no debe impedir el arranque
+            print(f"AVISO: No se pudo guardar la caché de configuración: {e}")
+
     # --- Propiedades de acceso por sección ---
-    @property
+    # La configuración no cambia tras cargarse, así que cada valor se calcula una vez
+    # (cached_property). api_endpoint/api_key siguen leyendo el entorno en cada acceso.
+    @functools.cached_property
     def station(self) -> dict: return self._config.get("station", {})
-    @property
+    @functools.cached_property
     def hardware(self) -> dict: return self._config.get("hardware", {})
-    @property
+    @functools.cached_property
     def resource_mapping(self) -> dict: return self._config.get("resource_mapping", {})
-    @property
+    @functools.cached_property
     def test_thresholds(self) -> dict: return self._config.get("test_thresholds", {})
-    @property
+    @functools.cached_property
     def ui_messages(self) -> dict: return self._config.get("ui_messages", {})
-    @property
+    @functools.cached_property
     def api_config(self) -> dict: return self._config.get("api", {})
-    @property
+    @functools.cached_property
     def logging(self) -> dict: return self._config.get("logging", {})
 
     # --- Propiedades de hardware detalladas ---
-    @property
+    @functools.cached_property
     def rs485_config(self) -> dict: return self.hardware.get("rs485", {})
-    @property
+    @functools.cached_property
     def relay_config(self) -> dict: return self.hardware.get("relay_controller", {})
-    @property
-    def ppk2_config(self) -> dict: return self.hardware.get("power_meters", {}).get("ua_meter_ppk2", {})
-    @property
-    def ina3221_config(self) -> dict: return self.hardware.get("power_meters", {}).get("active_meter_ina3221", {})
+    @functools.cached_property
+    def power_meters(self) -> dict: return self.hardware.get("power_meters", {})
+    @functools.cached_property
+    def ua_meter_config(self) -> dict: return self.power_meters.get("ua_meter", {})
+    @functools.cached_property
+    def ppk2_config(self) -> dict: return self.ua_meter_config.get("ppk2", {})
+    @functools.cached_property
+    def ina3221_config(self) -> dict: return self.power_meters.get("active_meter_ina3221", {})
 
-    @property
+    @functools.cached_property
     def ppk2_source_voltage_mv(self) -> int: return self.ppk2_config.get("source_voltage_mv", 3700)
-    @property
+    @functools.cached_property
     def ppk2_serial_number(self) -> str: return self.ppk2_config.get("serial_number", "UNKNOWN_PPK2")
 
-    @property
+    @functools.cached_property
     def rs485_port(self) -> str: return self.rs485_config.get("port", "/dev/ttyUSB0")
-    @property
+    @functools.cached_property
     def rs485_baud_rate(self) -> int: return self.rs485_config.get("baud_rate", 115200)
+    @functools.cached_property
+    def rs485_latency_ms(self) -> int | None:
+        """Latencia del adaptador USB-RS485 en ms; None deja la del driver."""
+        return self.rs485_config.get("latency_ms", 1)
+    @functools.cached_property
+    def rs485_timeouts(self) -> dict:
+        """Timeout de lectura por comando del DUT (sin argumentos), en segundos."""
+        return {str(cmd).lower(): float(t) for cmd, t in self.rs485_config.get("timeouts", {}).items()}
 
-    @property
+    @functools.cached_property
     def relay_serial_number(self) -> str: return self.relay_config.get("serial_number", "UNKNOWN_RELAY")
 
 
     # --- Propiedades de mapeo de recursos detalladas ---
-    @property
-    def relay_map(self) -> dict: return self.resource_mapping.get("relay_map", {})
-    @property
+    @functools.cached_property
+    def relay_map(self) -> dict:
+        # Claves internadas y números ya convertidos a int: se resuelven una sola vez
+        return {sys.intern(str(name)): int(num) for name, num in self.resource_mapping.get("relay_map", {}).items()}
+    @functools.cached_property
     def ina3221_channel_map(self) -> dict: return self.resource_mapping.get("ina3221_channel_map", {})
 
-    @property
+    @functools.cached_property
     def relay_num_battery(self) -> int: return self.relay_map.get("connect_battery")
-    @property
+    @functools.cached_property
     def relay_num_vin_power(self) -> int: return self.relay_map.get("apply_vin_power")
-    @property
+    @functools.cached_property
     def relay_num_tamper_1(self) -> int: return self.relay_map.get("connect_tamper_1")
-    @property
+    @functools.cached_property
     def relay_num_tamper_2(self) -> int: return self.relay_map.get("connect_tamper_2")
 
-    @property
+    @functools.cached_property
     def ina3221_ch_vin_current(self) -> int: return self.ina3221_channel_map.get("vin_current")
-    @property
+    @functools.cached_property
     def ina3221_ch_battery_charge(self) -> int: return self.ina3221_channel_map.get("battery_charge_current")
 
     # --- Propiedades de umbrales de test detalladas ---
-    @property
+    @functools.cached_property
     def threshold_sleep_current_ua(self) -> float: return self.test_thresholds.get("sleep_current_max_ua")
-    @property
+    @functools.cached_property
     def threshold_vin_current_min_ma(self) -> float: return self.test_thresholds.get("vin_current_min_ma")
-    @property
+    @functools.cached_property
     def threshold_vin_current_max_ma(self) -> float: return self.test_thresholds.get("vin_current_max_ma")
-    @property
+    @functools.cached_property
     def threshold_battery_charge_min_ma(self) -> float: return self.test_thresholds.get("battery_charge_min_ma")
-    @property
+    @functools.cached_property
     def threshold_battery_charge_max_ma(self) -> float: return self.test_thresholds.get("battery_charge_max_ma")
 
     # --- Propiedades de aplicación y API ---
-    @property
+    @functools.cached_property
     def app_title(self) -> str: return self.station.get("app_title", "JIT Tester")
-    @property
+    @functools.cached_property
     def app_resolution(self) -> str: return self.station.get("app_resolution", "800x600")
-    @property
+    @functools.cached_property
     def station_id(self) -> str: return self.station.get("id", "UNKNOWN_STATION")
 
-    @property
-    def api_timeout(self) -> int: return self.api_config.get("timeout", 5)
+    @functools.cached_property
+    def api_timeout(self) -> int: return self.api_config.get("request_timeout_s", 5)
 
     @property
     def api_endpoint(self) -> str:
@@ -134,11 +252,78 @@ class ConfigManager:
         return key
 
     # --- Propiedades del procedimiento de test ---
-    @property
+    @functools.cached_property
     def stop_on_fail(self) -> bool:
         return self._config.get("test_procedure", {}).get("stop_on_fail", True)
 
+    @functools.cached_property
+    def relay_settle_timeout_s(self) -> float:
+        return self._config.get("test_procedure", {}).get("relay_settle_timeout_s", 0.5)
+
+    @functools.cached_property
+    def relay_poll_interval_s(self) -> float:
+        return self._config.get("test_procedure", {}).get("relay_poll_interval_s", 0.02)
+
+    @functools.cached_property
+    def tamper_settle_s(self) -> float:
+        return self._config.get("test_procedure", {}).get("tamper_settle_s", 0.5)
+
+    @functools.cached_property
+    def enabled_steps(self) -> frozenset | None:
+        """Claves de los pasos a ejecutar (test_procedure.enabled_steps); None = todos."""
+        steps = self._config.get("test_procedure", {}).get("enabled_steps")
+        return frozenset(steps) if steps is not None else None
+
     # --- Propiedades de logging ---
-    @property
+    @functools.cached_property
     def log_file_path(self) -> str:
-        return self.logging.get("log_file_path", "./logs/")
\ No newline at end of file
+        return self.logging.get("file_path", "./logs/")
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> ConfigManager:
+    """Devuelve la instancia única de ConfigManager del proceso (se carga una sola vez)."""
+    return ConfigManager()
+
+
+def freeze_config(config_path: Path = Path("config.yaml"), output_path: Path = FROZEN_CONFIG_PATH) -> Path:
+    """
+    Genera un módulo Python con la configuración ya resuelta como literales,
+    para que ConfigManager pueda arrancar sin parsear el YAML.
+
+    Args:
+        config_path (Path): Ruta al fichero config.yaml de origen.
+        output_path (Path): Ruta del módulo a generar.
+
+    Returns:
+        Path: La ruta del módulo generado.
+    """
+    stat = os.stat(config_path)
+    with open(config_path, 'r') as f:
+        config = yaml.load(f, Loader=SafeLoader)
+
+    content = (
+        "# Generado con `python -m xmnz_tester.config freeze`. No editar a mano.\n"
+        f"# Origen: {Path(config_path).resolve()}\n"
+        f"SOURCE_MTIME_NS = {stat.st_mtime_ns}\n"
+        f"SOURCE_SIZE = {stat.st_size}\n\n"
+        f"CONFIG = {pprint.pformat(config, sort_dicts=False)}\n"
+    )
+
+    tmp_path = Path(output_path).with_suffix(".tmp")
+    tmp_path.write_text(content, encoding='utf-8')
+    os.replace(tmp_path, output_path)
+    return Path(output_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Utilidades de configuración del tester.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    freeze_parser = subparsers.add_parser("freeze", help="Congela config.yaml en xmnz_tester/_config_frozen.py")
+    freeze_parser.add_argument("--config", type=Path, default=Path("config.yaml"), help="Fichero YAML de origen")
+    freeze_parser.add_argument("--output", type=Path, default=FROZEN_CONFIG_PATH, help="Módulo Python a generar")
+
+    args = parser.parse_args()
+    if args.command == "freeze":
+        print(f"Configuración congelada en {freeze_config(args.config, args.output)}")
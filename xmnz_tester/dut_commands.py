@@ -22,4 +22,23 @@ class DutCommands:
 
     # Comandos para controlar el relé de la placa
     BOARD_RELAY_ON = "relay on"
-    BOARD_RELAY_OFF = "relay off"
\ No newline at end of file
+    BOARD_RELAY_OFF = "relay off"
+
+    @staticmethod
+    def as_bytes(command: str) -> bytes:
+        """
+        Devuelve el comando listo para escribir en el puerto serie (con el terminador '\n').
+        Los comandos de esta clase se codifican una sola vez al importar el módulo.
+        """
+        encoded = _COMMAND_BYTES.get(command)
+        if encoded is None:
+            encoded = f"{command}\n".encode('utf-8')
+        return encoded
+
+
+# Tabla comando -> bytes construida al importar, a partir de las constantes de DutCommands
+_COMMAND_BYTES = {
+    value: f"{value}\n".encode('utf-8')
+    for name, value in vars(DutCommands).items()
+    if name.isupper() and isinstance(value, str)
+}
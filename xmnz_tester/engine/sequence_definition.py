@@ -1,18 +1,41 @@
-TEST_SEQUENCE = [
-    {'key': 'test_step_connect_battery'},
-    {'key': 'test_step_apply_vin'},
-    {'key': 'test_step_check_initial_status'},
-    {'key': 'test_step_measure_active_power'},
-    {'key': 'test_step_test_tampers'},
-    {'key': 'test_step_test_onboard_relay'},
-    {'key': 'test_step_disconnect_battery'},
-    {'key': 'test_step_simulate_battery'},  # TODO: ¿Rename?
-    {'key': 'test_step_disconnect_vin'},
-    {'key': 'test_step_check_board_status'},
-    {'key': 'test_step_set_low_power_mode'},
-    {'key': 'test_step_measure_sleep_current'},
-    {'key': 'test_step_wakeup_from_sleep'},
-    {'key': 'test_step_send_current_result'},
-    {'key': 'test_step_get_barcode'},
-    {'key': 'test_step_modem_send'}
-]
\ No newline at end of file
+# Secuencia de pasos: (clave del paso, argumentos posicionales).
+# El runner resuelve cada clave una sola vez al construirse: a la tabla RELAY_STEPS
+# de test_runner.py o, si no está, al método '_<clave>'.
+TEST_SEQUENCE = (
+    ('test_step_connect_battery', ()),
+    ('test_step_apply_vin', ()),
+    ('test_step_check_initial_status', ()),
+    ('test_step_measure_active_power', ()),
+    ('test_step_test_tampers', ()),
+    ('test_step_test_onboard_relay', ()),
+    ('test_step_disconnect_battery', ()),
+    ('test_step_simulate_battery', ()),  # TODO: ¿Rename?
+    ('test_step_disconnect_vin', ()),
+    ('test_step_check_board_status', ()),
+    ('test_step_set_low_power_mode', ()),
+    ('test_step_measure_sleep_current', ()),
+    ('test_step_wakeup_from_sleep', ()),
+    ('test_step_send_current_result', ()),
+    ('test_step_get_barcode', ()),
+    ('test_step_modem_send', ()),
+)
+
+# Pasos sin los que el resto no tiene sentido (DUT sin alimentar o sin comunicación):
+# si fallan, la secuencia se detiene aunque stop_on_fail esté desactivado.
+CRITICAL_STEPS = frozenset({
+    'test_step_connect_battery',
+    'test_step_apply_vin',
+    'test_step_check_initial_status',
+})
+
+
+def enabled_sequence(enabled_steps=None) -> tuple:
+    """
+    Devuelve TEST_SEQUENCE filtrada por las claves habilitadas, manteniendo el orden.
+
+    Args:
+        enabled_steps: Claves de paso a ejecutar. Si es None se ejecutan todas.
+    """
+    if enabled_steps is None:
+        return TEST_SEQUENCE
+    return tuple(step for step in TEST_SEQUENCE if step[0] in enabled_steps)
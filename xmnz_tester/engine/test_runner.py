@@ -1,25 +1,76 @@
+import atexit
+import concurrent.futures
+import functools
+import queue
 import time
 import threading
 import json
 from pathlib import Path
 from typing import Optional
-from .sequence_definition import TEST_SEQUENCE
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from .sequence_definition import CRITICAL_STEPS, enabled_sequence
 from ..config import ConfigManager
 from ..hal.relays import RelayController
 from ..hal.rs485 import RS485Controller
 from ..hal.meter_interface import CurrentMeterInterface
 from ..hal.ina3221 import PowerMeterINA3221
-from ..models.test_result import TestResult, TestStepResult
+from ..models.test_result import TestResult
 from ..models.dut_info import DutInfo
 from ..models.dut_status import DutStatus
 from ..dut_commands import DutCommands
 from ..services.api_client import ApiClient
 
+# La subida a la API es red pura y no afecta al resultado: se hace en segundo plano
+# para que el operador vea el fin del test nada más desconectar el hardware.
+API_UPLOAD_WORKERS = 2
+_api_executor = concurrent.futures.ThreadPoolExecutor(max_workers=API_UPLOAD_WORKERS, thread_name_prefix="api-upload")
+atexit.register(_api_executor.shutdown, wait=True)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_api_client(endpoint_url: str, api_key: str, timeout_s: int) -> ApiClient:
+    """
+    Cliente API compartido por todos los TestRunner del proceso (la GUI crea uno por
+    test), para que los envíos reutilicen la misma conexión HTTP.
+    """
+    return ApiClient(endpoint_url, api_key, timeout_s, pool_maxsize=API_UPLOAD_WORKERS)
+
+# 'details' compartido por todos los pasos que no aportan datos. No se debe modificar.
+_EMPTY_DETAILS = {}
+
+# Pasos que solo conmutan un relé y verifican que ha cambiado. Los ejecuta _relay_step:
+# clave del paso -> (clave de ui_messages, propiedad de config con el nº de relé,
+#                    estado deseado, mensaje PASS, mensaje FAIL)
+RELAY_STEPS = {
+    # Step 1: Connect the battery (REL4 ON) to power the DUT.
+    'test_step_connect_battery': ("step_connect_battery", "relay_num_battery", True,
+                                  "Batería conectada.", "Fallo al conectar la batería."),
+    # Step 2: Power the device from Vin (REL3 ON).
+    'test_step_apply_vin': ("step_apply_vin", "relay_num_vin_power", True,
+                            "Alimentación externa (VIN) aplicada.", "Fallo al aplicar VIN."),
+    # Step 6: Check board relay with REL1 off and reading tamper in1.
+    'test_step_test_onboard_relay': ("step_test_onboard_relay", "relay_num_tamper_1", False,
+                                     "Relé de tamper desactivado correctamente -> PASS",
+                                     "Fallo al desactivar el relé de tamper -> FAIL"),
+    # Step 7: Disconnect the battery (REL4 OFF).
+    'test_step_disconnect_battery': ("step_disconnect_battery", "relay_num_battery", False,
+                                     "Batería desconectada.", "Fallo al desconectar la batería."),
+    # Step 9: Disconnect Vin (REL3 OFF).
+    'test_step_disconnect_vin': ("step_disconnect_vin", "relay_num_vin_power", False,
+                                 "Alimentación externa (VIN) desconectada.", "Fallo al desconectar VIN."),
+}
+
 class TestRunner:
     """
     Orquesta la secuencia completa de tests, interactuando con la capa HAL
     y reportando los resultados a través de una función callback.
     """
+    # Solo estos estados se guardan en el TestResult; INFO/TESTING solo van a la GUI
+    _PERSISTED_STATUSES = frozenset({"PASS", "FAIL", "WARN"})
+
     def __init__(self,
             config_manager: ConfigManager,
             relay_controller: RelayController,
@@ -27,7 +78,8 @@ class TestRunner:
             ua_meter: CurrentMeterInterface,
             ma_meter: PowerMeterINA3221,
             gui_callback: callable,
-            stop_event: threading.Event):
+            stop_event: threading.Event,
+            report_queue: Optional[queue.Queue] = None):
         """
         Inicializa el motor de test.
 
@@ -35,12 +87,24 @@ class TestRunner:
             config_manager (ConfigManager): La instancia del gestor de configuración.
             gui_callback (callable): Función para enviar actualizaciones a la GUI.
             stop_event (threading.Event): Evento para señalar la detención del test.
+            report_queue (queue.Queue, optional): Si se indica, los mensajes se encolan como
+                (step_id, message, status) en lugar de llamar al callback, y la GUI los
+                consume a su ritmo. Si se llena se descarta el mensaje más antiguo.
         """
         self.config = config_manager
         self.callback = gui_callback
+        self.report_queue = report_queue
         self.stop_event = stop_event
         self.test_result = None
         self.step_counter = 0
+        # Se activa con el primer FAIL reportado; el resultado final se deriva de aquí
+        self._failed = False
+        # Igual que _failed, pero solo para el paso en curso
+        self._step_failed = False
+        # El DUT confirmó el paso a bajo consumo; si no, se omiten la medida y la espera
+        self._low_power_acked = False
+        # Último consumo en reposo medido, para enviarlo al DUT
+        self._last_sleep_current_ua = 0.0
 
         # Controladores del HAL
         self.relay_controller = relay_controller
@@ -52,28 +116,98 @@ class TestRunner:
         self.dut_status: Optional[DutStatus] = None
         self.test_result: Optional[TestResult] = None
 
+        # Secuencia resuelta y validada una sola vez, antes de tocar el hardware:
+        # (nombre del método, método ligado, args, crítico)
+        self._resolved_sequence = tuple(
+            (f"_{step_key}", self._resolve_step(step_key), args, step_key in CRITICAL_STEPS)
+            for step_key, args in enabled_sequence(self.config.enabled_steps)
+        )
+        missing = [name for name, method, _, _ in self._resolved_sequence if method is None]
+        if missing:
+            raise ValueError(f"Pasos de TEST_SEQUENCE sin método en TestRunner: {', '.join(missing)}")
+
+        # Plantillas de ui_messages validadas una vez: clave -> str.format ligado
+        self._step_messages = self._compile_step_messages(self.config.ui_messages)
+
+    def _resolve_step(self, step_key: str):
+        """Devuelve el callable de un paso: de la tabla RELAY_STEPS o el método '_<clave>'."""
+        relay_step = RELAY_STEPS.get(step_key)
+        if relay_step is not None:
+            return functools.partial(self._relay_step, *relay_step)
+        return getattr(self, f"_{step_key}", None)
+
+    @staticmethod
+    def _compile_step_messages(ui_messages: dict) -> dict:
+        """
+        Prepara las plantillas de inicio de paso ("Paso {}: ...") para _start_step.
+
+        Las plantillas que no se pueden formatear con el número de paso se descartan
+        con un aviso, y ese paso usa el mensaje por defecto.
+        """
+        compiled = {}
+        for key, template in ui_messages.items():
+            try:
+                template.format(0)
+            except (AttributeError, IndexError, KeyError, ValueError) as e:
+                print(f"AVISO: Plantilla de ui_messages '{key}' no válida ({e!r}). Se usará la genérica.")
+                continue
+            compiled[key] = template.format
+        return compiled
+
     def _report(self, message: str, status: str = "INFO", *, step_id: str = None, details: dict = None):
         """Metodo centralizado para enviar mensajes y guardar el resultado del paso."""
-        if self.callback:
-            self.callback(step_id, message, status)
+        status = status.upper()
+        if status == "FAIL":
+            self._failed = True
+            self._step_failed = True
+
+        persisted = status in self._PERSISTED_STATUSES
+        # Sin cola ni callback los mensajes informativos no llegan a ningún sitio
+        if not persisted and not self._has_consumer:
+            return
+        self._notify(step_id, message, status)
+
+        # Sin test en curso (p. ej. error antes de crear el TestResult) solo se notifica
+        if self.test_result is None or not persisted:
+            return
 
-        if self.test_result:
-            step_name = step_id or f"Paso {self.step_counter}"
+        self.test_result.add_step_raw(
+            step_id or f"Paso {self.step_counter}",
+            status,
+            message,
+            details if details is not None else _EMPTY_DETAILS
+        )
+
+    @property
+    def _has_consumer(self) -> bool:
+        """True si hay cola o callback que reciba las notificaciones."""
+        return self.report_queue is not None or bool(self.callback)
+
+    def _notify(self, step_id: Optional[str], message: str, status: str):
+        """Envía un mensaje a la GUI sin registrarlo en el resultado del test."""
+        if self.report_queue is not None:
+            self._enqueue_report((step_id, message, status))
+        elif self.callback:
+            self.callback(step_id, message, status)
 
-            step = TestStepResult(
-                step_name=step_name,
-                status=status.upper(),
-                message=message,
-                details=details or {}
-            )
-            self.test_result.add_step(step)
+    def _enqueue_report(self, item: tuple):
+        """Encola un mensaje sin bloquear; si la cola está llena descarta el más antiguo."""
+        while True:
+            try:
+                self.report_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.report_queue.get_nowait()
+                except queue.Empty:
+                    pass
 
     def _start_step(self, step_key: str):
         """Incrementa, formatea y reporta el mensaje de inicio de un paso."""
         self.step_counter += 1
         method_name = f"_{step_key}"
-        message_template = self.config.ui_messages.get(step_key, f"Iniciando: {step_key}")
-        final_message = message_template.format(self.step_counter)
+        format_message = self._step_messages.get(step_key)
+        final_message = format_message(self.step_counter) if format_message else f"Iniciando: {step_key}"
         self._report(final_message, "TESTING", step_id=method_name)
 
     def run_full_test(self):
@@ -81,6 +215,9 @@ class TestRunner:
         Punto de entrada principal. Ejecuta la secuencia completa de tests.
         """
         self.step_counter = 0
+        self._failed = False
+        self._low_power_acked = False
+        self._last_sleep_current_ua = 0.0
         self.test_result = TestResult(station_id=self.config.station_id)
 
         try:
@@ -91,81 +228,97 @@ class TestRunner:
         finally:
             self.test_result.finalize()
             self._disconnect_all_hardware()
-            self._report(f"Test finalizado. Resultado: {self.test_result.overall_status}", self.test_result.overall_status, step_id="final_summary")
+            final_status = "FAIL" if self._failed else "PASS"
+            self._report(f"Test finalizado. Resultado: {final_status}", final_status, step_id="final_summary")
 
             self._log_result_locally()
-            self._send_results_to_api()
+            # La subida no altera el resultado: un fallo se notifica a la GUI por separado
+            self._notify("api_send", f"[{self._result_tag(self.test_result)}] Enviando resultados a la plataforma...",
+                         "TESTING")
+            _api_executor.submit(self._send_results_to_api, self.test_result)
 
-            return self.test_result.overall_status
+            return final_status
 
     def _connect_all_hardware(self):
-        """Intenta conectar todos los dispositivos de hardware inyectados."""
+        """
+        Intenta conectar todos los dispositivos de hardware inyectados.
+
+        Las conexiones son independientes y casi todo su tiempo es espera de USB/I2C,
+        así que se lanzan en paralelo. Los resultados se reportan en el orden habitual
+        desde este hilo y se relanza el primer fallo para detener la ejecución.
+        """
         self._report("Conectando dispositivos de hardware...", "INFO")
 
-        try:
-            self.relay_controller.connect()
-            self._report("Controlador de relés conectado.", "PASS")
-        except Exception as e:
-            self._report(f"Error conectando relés: {e}", "FAIL")
-            raise  # Relanzamos para detener la ejecución
+        devices = (
+            ("Controlador de relés", "relés", self.relay_controller.connect),
+            ("Controlador RS485", "RS485", self.serial_controller.connect),
+            ("PPK2", "PPK2", self.ua_meter.connect),
+            ("Medidor INA3221", "INA3221", self.ina3221_meter.connect),
+        )
 
-        try:
-            self.serial_controller.connect()
-            self._report("Controlador RS485 conectado.", "PASS")
-        except Exception as e:
-            self._report(f"Error conectando RS485: {e}", "FAIL")
-            raise
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(devices)) as executor:
+            futures = [executor.submit(connect) for _, _, connect in devices]
 
-        try:
-            self.ua_meter.connect()
-            self._report("PPK2 conectado.", "PASS")
-        except Exception as e:
-            self._report(f"Error conectando PPK2: {e}", "FAIL")
-            raise
+        first_error = None
+        for (name, short_name, _), future in zip(devices, futures):
+            try:
+                # Los medidores indican el fallo devolviendo False en lugar de lanzar
+                if future.result() is False:
+                    raise ConnectionError(f"{name} no respondió.")
+                self._report(f"{name} conectado.", "PASS")
+            except Exception as e:
+                self._report(f"Error conectando {short_name}: {e}", "FAIL")
+                first_error = first_error or e
 
-        try:
-            self.ina3221_meter.connect()
-            self._report("Medidor INA3221 conectado.", "PASS")
-        except Exception as e:
-            self._report(f"Error conectando INA3221: {e}", "FAIL")
-            raise
+        if first_error:
+            raise first_error  # Relanzamos para detener la ejecución
 
     def _disconnect_all_hardware(self):
-        """Desconecta de forma segura todos los controladores del HAL."""
+        """
+        Desconecta de forma segura todos los controladores del HAL.
+
+        Como en la conexión, las desconexiones son independientes y se hacen en paralelo.
+        Un fallo en un dispositivo se reporta sin impedir desconectar los demás.
+        """
         self._report("--- Desconectando del hardware ---", "HEADER", step_id="disconnect_hardware")
-        if self.relay_controller:
-            self.relay_controller.disconnect()
-        if self.serial_controller:
-            self.serial_controller.disconnect()
-        if self.ua_meter:
-            self.ua_meter.disconnect()
-        if self.ina3221_meter:
-            self.ina3221_meter.disconnect()
+
+        devices = [
+            (name, device) for name, device in (
+                ("relés", self.relay_controller),
+                ("RS485", self.serial_controller),
+                ("PPK2", self.ua_meter),
+                ("INA3221", self.ina3221_meter),
+            ) if device
+        ]
+        if not devices:
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(devices)) as executor:
+            futures = [executor.submit(device.disconnect) for _, device in devices]
+
+        for (name, _), future in zip(devices, futures):
+            try:
+                future.result()
+            except Exception as e:
+                self._report(f"Error desconectando {name}: {e}", "FAIL")
 
     def _run_test_steps(self):
         """Itera sobre la secuencia, extrae los argumentos y ejecuta el método."""
         self._report("--- Iniciando secuencia de pruebas ---", "INFO")
 
-        for step_info in TEST_SEQUENCE:
+        stop_on_fail = self.config.stop_on_fail
+        for _, method_to_call, args, critical in self._resolved_sequence:
             if self.stop_event and self.stop_event.is_set():
                 self._report("Test detenido por el usuario.", "FAIL")
                 break
 
-            step_key = step_info['key']
-            method_name = f"_{step_key}"
-
-            args = step_info.get('args', [])
-            kwargs = step_info.get('kwargs', {})
+            self._step_failed = False
+            method_to_call(*args)
 
-            try:
-                method_to_call = getattr(self, method_name)
-                method_to_call(*args, **kwargs)
-            except AttributeError:
-                self._report(f"Error: No se encontró el método '{method_name}'", "FAIL")
+            if self._step_failed and critical:
+                self._report("La secuencia se detuvo: ha fallado un paso crítico.", "INFO")
                 break
-
-
-            if self.test_result.overall_status == "FAIL" and self.config.stop_on_fail:
+            if self._failed and stop_on_fail:
                 self._report("La secuencia se detuvo debido a un fallo.", "INFO")
                 break
 
@@ -184,52 +337,67 @@ class TestRunner:
             file_path = Path(log_dir) / f"{sn}_{timestamp}.json"
 
 
-            # 4. Escribir en el fichero
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.test_result.to_dict(), f, indent=2, ensure_ascii=False)
+            # 4. Escribir en el fichero (orjson codifica directamente a UTF-8 si está disponible)
+            if orjson is not None:
+                payload = orjson.dumps(
+                    self.test_result.to_dict(),
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                )
+                with open(file_path, 'wb') as f:
+                    f.write(payload)
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.test_result.to_dict(), f, indent=2, ensure_ascii=False, default=str)
 
             self._report(f"Resultado guardado localmente en: {file_path}", "INFO", step_id="local_log")
 
         except Exception as e:
             self._report(f"Error al guardar el log local: {e}", "FAIL", step_id="local_log")
 
-    def _send_results_to_api(self):
-        """Crea el cliente API y envía los resultados."""
-        api_client = ApiClient(self.config.api_endpoint, self.config.api_key, self.config.api_timeout)
+    def _send_results_to_api(self, test_result: TestResult):
+        """
+        Crea el cliente API y envía los resultados.
+
+        Se ejecuta en el pool 'api-upload', posiblemente ya con otro test en marcha,
+        así que recibe su propio TestResult y solo notifica a la GUI. Los mensajes
+        llevan el S/N y la hora de inicio porque pueden llegar durante el test siguiente.
+        Un fallo aquí no cambia el resultado (PASS/FAIL) del DUT.
+        """
+        tag = self._result_tag(test_result)
+        try:
+            api_client = _get_api_client(self.config.api_endpoint, self.config.api_key, self.config.api_timeout)
+        except ValueError as e:
+            self._notify("api_send", f"[{tag}] No se enviarán los resultados: {e}", "FAIL")
+            return
 
-        if api_client.send_test_result(self.test_result):
-            self._report("Resultados sincronizados con la plataforma.", "INFO", step_id="api_send")
+        if api_client.send_test_result(test_result):
+            self._notify("api_send", f"[{tag}] Resultados sincronizados con la plataforma.", "INFO")
         else:
             # TODO: Implementar lógica de reintentos o manejo de errores
-            self._report("Fallo al sincronizar resultados con la plataforma.", "FAIL", step_id="api_send")
-
+            self._notify("api_send", f"[{tag}] Fallo al sincronizar resultados con la plataforma.", "FAIL")
 
-# ----- TEST STEPS -----
-    def _test_step_connect_battery(self):
-        """Step 1: Connect the battery (REL4 ON) to power the DUT. """
-        self._start_step("step_connect_battery")
-
-        relay_id = self.config.relay_num_battery
+    @staticmethod
+    def _result_tag(test_result: TestResult) -> str:
+        """Identifica un resultado en los mensajes: 'S/N <serie> @ <hora de inicio>'."""
+        return f"S/N {test_result.serial_number} @ {test_result.start_time:%Y-%m-%d %H:%M:%S}"
 
-        self.relay_controller.set_relay(relay_id, True)
-        time.sleep(0.5)
-        if self.relay_controller.get_relay_state(relay_id):
-            self._report("Batería conectada.", "PASS")
-        else:
-            self._report("Fallo al conectar la batería.", "FAIL")
 
-    def _test_step_apply_vin(self):
-        """Step 2: Power the device from Vin (REL3 ON). """
-        self._start_step("step_connect_battery")
+# ----- TEST STEPS -----
+    def _relay_step(self, message_key: str, relay_attr: str, target: bool, success_msg: str, fail_msg: str):
+        """Paso genérico de RELAY_STEPS: conmuta un relé y verifica que alcanza el estado."""
+        self._start_step(message_key)
 
-        relay_id = self.config.relay_num_vin_power
+        try:
+            relay_id = getattr(self.config, relay_attr)
 
-        self.relay_controller.set_relay(relay_id, True)
-        time.sleep(0.5)
-        if self.relay_controller.get_relay_state(relay_id):
-            self._report("Alimentación externa (VIN) aplicada.", "PASS")
-        else:
-            self._report("Fallo al aplicar VIN.", "FAIL")
+            self.relay_controller.set_relay(relay_id, target)
+            if self._wait_relay(relay_id, target):
+                self._report(success_msg, "PASS")
+            else:
+                self._report(fail_msg, "FAIL")
+        except Exception as e:
+            self._report(f"{fail_msg} Error: {e}", "FAIL")
 
     def _test_step_check_initial_status(self):
         """Step 3: Checks DUT initial status."""
@@ -239,6 +407,8 @@ class TestRunner:
 
         if device_status_dict:
             self.dut_info = DutInfo.from_dict(device_status_dict)
+            # El S/N identifica el resultado en el log local y en los avisos de subida a la API
+            self.test_result.serial_number = self.dut_info.device_serial
             self._report(f"Obtenido DeviceInfo. S/N: {self.dut_info.device_serial}", "PASS", details=device_status_dict)
         else:
             self._report("Fallo al obtener DeviceInfo del DUT.", "FAIL")
@@ -250,15 +420,20 @@ class TestRunner:
         vin_ch = self.config.ina3221_ch_vin_current
         bat_ch = self.config.ina3221_ch_battery_charge
 
-        vin_data = self.ina3221_meter.read_channel(vin_ch)
-        bat_data = self.ina3221_meter.read_channel(bat_ch)
+        readings = self.ina3221_meter.read_channels((vin_ch, bat_ch))
+        vin_data = readings[vin_ch]
+        bat_data = readings[bat_ch]
 
         if not vin_data or not bat_data:
             self._report("Fallo al leer medidor INA3221.", "FAIL")
             return
 
-        self._report(f"Consumo VIN: {vin_data['current_mA']:.2f} mA", "PASS", details=vin_data)
-        self._report(f"Carga Batería: {bat_data['current_mA']:.2f} mA", "PASS", details=bat_data)
+        self._report(
+            f"Consumo VIN: {vin_data['current_mA']:.2f} mA\n"
+            f"Carga Batería: {bat_data['current_mA']:.2f} mA",
+            "PASS",
+            details={'vin': vin_data, 'battery': bat_data}
+        )
 
     def _test_step_test_tampers(self):
         """
@@ -266,36 +441,58 @@ class TestRunner:
 
         Acciona los relés conectados a las entradas de tamper y verifica que el
         DUT reporta el estado correcto (OPEN/CLOSED) para cada combinación.
+        Las combinaciones se recorren en código Gray (00 -> 10 -> 11 -> 01), de modo
+        que en cada transición solo conmuta un relé; ambos se verifican con una sola
+        lectura de la placa.
         """
         self._start_step("step_test_tampers")
 
         # Asumiendo que relé ON == tamper CLOSED y relé OFF == tamper OPEN.
-        RELAY_ON_STATE = True
-        RELAY_OFF_STATE = False
         TAMPER_CLOSED_STR = "CLOSED"
         TAMPER_OPEN_STR = "OPEN"
+        GRAY_SEQUENCE = ((False, False), (True, False), (True, True), (False, True))
 
         overall_success = True  # Para seguir el resultado final del paso
 
-        def check_combination(relay1_on: bool, relay2_on: bool, expected_tamp1: str, expected_tamp2: str):
-            """Función helper para probar una combinación y reportar el resultado."""
+        relay_tamper_1 = self.config.relay_num_tamper_1
+        relay_tamper_2 = self.config.relay_num_tamper_2
+        if relay_tamper_1 is None or relay_tamper_2 is None:
+            self._report("Error de configuración: faltan 'connect_tamper_1'/'connect_tamper_2' en relay_map.", "FAIL",
+                         step_id="step_test_tampers")
+            return
+
+        def check_combination(relay_states: tuple):
+            """Aplica una combinación (la placa solo escribe el relé que cambia) y la verifica."""
             nonlocal overall_success
 
-            # Configurar los relés
+            relay1_on, relay2_on = relay_states
             relay1_action = "ON" if relay1_on else "OFF"
             relay2_action = "ON" if relay2_on else "OFF"
             self._report(f"Configurando relés: T1={relay1_action}, T2={relay2_action}", "INFO")
 
-            self.relay_controller.set_relay(relay_tamper_1, RELAY_ON_STATE if relay1_on else RELAY_OFF_STATE)
-            self.relay_controller.set_relay(relay_tamper_2, RELAY_ON_STATE if relay2_on else RELAY_OFF_STATE)
+            target = {relay_tamper_1: relay1_on, relay_tamper_2: relay2_on}
+            self.relay_controller.set_relays(target)
+            mismatch = self._wait_relays(target)
+            if mismatch:
+                # Un FAIL por cada relé que no alcanzó su estado (bits activos de la diferencia)
+                while mismatch:
+                    bit = mismatch & -mismatch
+                    relay_id = bit.bit_length()
+                    self._report(f"El relé {relay_id} no alcanzó el estado {target[relay_id]}.", "FAIL")
+                    mismatch ^= bit
+                overall_success = False
+                return
 
-            time.sleep(0.5)
+            # Tiempo para que el DUT registre el cambio en la entrada
+            time.sleep(self.config.tamper_settle_s)
 
             if not self._update_dut_status():
                 overall_success = False
                 return
 
             # Comprobar el resultado
+            expected_tamp1 = TAMPER_CLOSED_STR if relay1_on else TAMPER_OPEN_STR
+            expected_tamp2 = TAMPER_CLOSED_STR if relay2_on else TAMPER_OPEN_STR
             actual_tamp1 = self.dut_status.tamper_states.get("tamper_1", "ERROR")
             actual_tamp2 = self.dut_status.tamper_states.get("tamper_2", "ERROR")
 
@@ -313,59 +510,23 @@ class TestRunner:
                 overall_success = False
 
         try:
-            relay_tamper_1 = self.config.relay_map["tamper_1"]
-            relay_tamper_2 = self.config.relay_map["tamper_2"]
-
             # Probar las 4 combinaciones lógicas
             self._report("--- Iniciando secuencia de prueba de tampers ---", "INFO")
 
-            check_combination(False, False, TAMPER_OPEN_STR, TAMPER_OPEN_STR)
-            check_combination(True, False, TAMPER_CLOSED_STR, TAMPER_OPEN_STR)
-            check_combination(False, True, TAMPER_OPEN_STR, TAMPER_CLOSED_STR)
-            check_combination(True, True, TAMPER_CLOSED_STR, TAMPER_CLOSED_STR)
+            for relay_states in GRAY_SEQUENCE:
+                check_combination(relay_states)
 
             self._report("--- Secuencia de prueba de tampers finalizada ---", "INFO")
 
-            self.relay_controller.set_relay(relay_tamper_1, RELAY_OFF_STATE)
-            self.relay_controller.set_relay(relay_tamper_2, RELAY_OFF_STATE)
-
-        except KeyError as e:
-            self._report(f"Error de configuración: No se encontró la clave de relé {e} en config.yaml", "FAIL")
-            overall_success = False
         except Exception as e:
             self._report(f"Error inesperado durante el test de tampers: {e}", "FAIL")
             overall_success = False
+        finally:
+            self.relay_controller.set_relays({relay_tamper_1: False, relay_tamper_2: False})
 
         if not overall_success:
             self._report("El paso de verificación de tampers ha fallado.", "FAIL", step_id="step_test_tampers")
 
-    def _test_step_test_onboard_relay(self):
-        """Step 6: Check board relay with REL1 off and reading tamper in1."""
-        self._start_step("step_test_onboard_relay")
-
-        try:
-            relay_id = self.config.relay_num_tamper_1
-
-            # Desactivar REL1
-            self.relay_controller.set_relay(relay_id, False)
-            time.sleep(1)  # Esperar un segundo para estabilizar
-
-            # Leer el estado del relé de tamper
-            if not self.relay_controller.get_relay_state(relay_id):
-                self._report("Relé de tamper desactivado correctamente -> PASS", "PASS")
-            else:
-                self._report("Fallo al desactivar el relé de tamper -> FAIL", "FAIL")
-
-        except Exception as e:
-            self._report(f"Error al verificar el relé de la placa: {e}", "FAIL")
-
-    def _test_step_disconnect_battery(self):
-        """Step 7: Disconnect the battery (REL4 OFF)."""
-        self._start_step("step_disconnect_battery")
-
-        self.relay_controller.set_relay(self.config.relay_num_battery, False)
-        self._report("Batería desconectada.", "PASS")
-
     def _test_step_simulate_battery(self):
         """Step 8: Enable 3v7 with uA meter."""
         self._start_step("step_simulate_battery")
@@ -375,13 +536,6 @@ class TestRunner:
         else:
             self._report("Fallo al habilitar alimentación desde uA Meter.", "FAIL")
 
-    def _test_step_disconnect_vin(self):
-        """Step 9: Disconnect Vin (REL3 OFF)."""
-        self._start_step("step_disconnect_vin")
-
-        self.relay_controller.set_relay(self.config.relay_num_vin_power, False)
-        self._report("Alimentación externa (VIN) desconectada.", "PASS")
-
     def _test_step_check_board_status(self):
         """Step 10: Asks DUT for status, parses returned JSON and checks it meets the expected status."""
         self._start_step("test_step_check_board_status")
@@ -398,9 +552,11 @@ class TestRunner:
         """Step 11: Send command to put the device in low power mode."""
         self._start_step("step_set_low_power_mode")
 
+        self._low_power_acked = False
         try:
-            response = self.serial_controller.send_command(DutCommands.SET_LOW_POWER)
+            response = self._send_dut_command(DutCommands.SET_LOW_POWER)
             if response: # TODO: validar respuesta esperada
+                self._low_power_acked = True
                 self._report("Dispositivo enviado a modo de bajo consumo -> PASS", "PASS")
             else:
                 self._report("Fallo al enviar comando de bajo consumo -> FAIL", "FAIL")
@@ -411,10 +567,15 @@ class TestRunner:
         """Step 12: Measure low current with uA meter."""
         self._start_step("step_measure_sleep_current")
 
+        if not self._low_power_acked:
+            self._report("El DUT no confirmó el modo de bajo consumo; medida omitida.", "FAIL")
+            return
+
         avg_current = self.ua_meter.get_current_measurement()
         threshold = self.config.threshold_sleep_current_ua
 
         if avg_current is not None:
+            self._last_sleep_current_ua = avg_current
             details = {'measured_ua': avg_current, 'threshold_ua': threshold}
             if avg_current < threshold:
                 self._report(f"Consumo en reposo: {avg_current:.2f} uA. OK.", "PASS", details=details)
@@ -427,6 +588,11 @@ class TestRunner:
         """Step 13: Wait for the device to return to normal mode."""
         self._start_step("step_wakeup_from_sleep")
 
+        if not self._low_power_acked:
+            # El DUT no llegó a dormir: no hay que esperar a que despierte
+            self._report("El DUT no entró en bajo consumo; espera omitida.", "INFO")
+            return
+
         self._report("Esperando que el DUT salga de bajo consumo...", "INFO")
         time.sleep(35)
         self.serial_controller.wait_for_prompt()
@@ -436,9 +602,9 @@ class TestRunner:
         """Step 14: Send uA current value to DUT."""
         self._start_step("step_send_current_result")
 
-        last_current = self.test_result.steps[-2].details.get('measured_ua', 0.0)
+        last_current = self._last_sleep_current_ua
         command = f"{DutCommands.SET_LAST_CURRENT}={last_current:.2f}"
-        response = self.serial_controller.send_command(command)
+        response = self._send_dut_command(command)
 
         if response and "OK" in response[0]:
             self._report(f"Resultado de consumo ({last_current:.2f} uA) enviado al DUT.", "PASS")
@@ -456,13 +622,70 @@ class TestRunner:
         """Step 16: Force sending modem JSON data."""
         self._start_step("step_modem_send")
 
-        response = self.serial_controller.send_command(DutCommands.FORCE_MODEM_SEND)
+        response = self._send_dut_command(DutCommands.FORCE_MODEM_SEND)
         if response and "OK" in response[0]:
             self._report("Comando para forzar envío de módem enviado.", "PASS")
         else:
             self._report("Fallo al forzar el envío del módem.", "FAIL")
 
 # Auxiliary methods
+    def _wait_relay(self, relay_id: int, expected: bool, timeout_s: float = None, interval_s: float = None) -> bool:
+        """
+        Espera a que un relé alcance el estado esperado, consultándolo cada interval_s.
+        Por defecto usa test_procedure.relay_settle_timeout_s y relay_poll_interval_s.
+
+        Returns:
+            bool: True en cuanto se observa el estado, False si se agota timeout_s.
+        """
+        if timeout_s is None:
+            timeout_s = self.config.relay_settle_timeout_s
+        if interval_s is None:
+            interval_s = self.config.relay_poll_interval_s
+
+        deadline_ns = time.monotonic_ns() + int(timeout_s * 1e9)
+        while True:
+            if self.relay_controller.get_relay_state(relay_id) == expected:
+                return True
+            if time.monotonic_ns() >= deadline_ns:
+                return False
+            time.sleep(interval_s)
+
+    def _send_dut_command(self, command: str) -> list | None:
+        """
+        Envía un comando al DUT con el timeout configurado para él en hardware.rs485.timeouts
+        (se busca por el nombre del comando, sin '=valor').
+        """
+        timeout_s = self.config.rs485_timeouts.get(command.split("=", 1)[0].lower())
+        return self.serial_controller.send_command(command, timeout_s=timeout_s)
+
+    def _wait_relays(self, states: dict, timeout_s: float = None, interval_s: float = None) -> int:
+        """
+        Como _wait_relay(), pero para varios relés a la vez: cada consulta es una única
+        lectura de la placa (get_mask) comparada con el estado esperado por XOR.
+
+        Returns:
+            int: Máscara de los relés que no alcanzaron su estado (bit 0 = relé 1); 0 si todos.
+        """
+        if timeout_s is None:
+            timeout_s = self.config.relay_settle_timeout_s
+        if interval_s is None:
+            interval_s = self.config.relay_poll_interval_s
+
+        checked = 0
+        expected = 0
+        for relay_id, state in states.items():
+            bit = 1 << (relay_id - 1)
+            checked |= bit
+            if state:
+                expected |= bit
+
+        deadline_ns = time.monotonic_ns() + int(timeout_s * 1e9)
+        while True:
+            mismatch = (self.relay_controller.get_mask() ^ expected) & checked
+            if not mismatch or time.monotonic_ns() >= deadline_ns:
+                return mismatch
+            time.sleep(interval_s)
+
     def _get_dut_json_response(self, command: str) -> dict | None:
         """
         Metodo auxiliar para enviar un comando al DUT, esperar una respuesta
@@ -475,7 +698,7 @@ class TestRunner:
             dict | None: Un diccionario con los datos si la respuesta es un JSON válido,
                          o None si hay un error.
         """
-        response_lines = self.serial_controller.send_command(command)
+        response_lines = self._send_dut_command(command)
 
         if not response_lines:
             self._report(f"No se recibió respuesta del DUT para el comando '{command}'.", "FAIL")
@@ -484,7 +707,8 @@ class TestRunner:
         try:
             # Unir las líneas por si el JSON viene fragmentado
             json_response = "".join(response_lines)
-            return json.loads(json_response)
+            # orjson.JSONDecodeError es subclase de json.JSONDecodeError
+            return orjson.loads(json_response) if orjson is not None else json.loads(json_response)
         except json.JSONDecodeError:
             self._report(f"Respuesta inválida (no es JSON): {response_lines}", "FAIL")
             return None
@@ -1,12 +1,14 @@
 import customtkinter as ctk
+import queue
 import threading
-from ..engine.sequence_definition import TEST_SEQUENCE
+from ..engine.sequence_definition import enabled_sequence
 from ..engine.test_runner import TestRunner
-from ..config import ConfigManager
+from ..config import get_config
 from ..hal.meter_factory import MeterFactory
 from ..hal.rs485 import RS485Controller
 from ..hal.relays import RelayController
 from ..hal.ina3221 import PowerMeterINA3221
+from ..hal.serial_pool import SerialPool
 
 STATUS_COLORS = {
     "default": ("#3498DB", "#2980B9"),  # Azul
@@ -15,6 +17,11 @@ STATUS_COLORS = {
     "testing": ("#F1C40F", "#F39C12")   # Amarillo
 }
 
+# Cola de mensajes del TestRunner: tamaño máximo, periodo de vaciado y mensajes por ciclo
+REPORT_QUEUE_MAXSIZE = 1024
+REPORT_DRAIN_INTERVAL_MS = 50
+REPORT_DRAIN_MAX_ITEMS = 100
+
 class TestStepWidget(ctk.CTkFrame):
     """Un widget para mostrar el estado de un único paso de test."""
     def __init__(self, master, step_name: str, step_id: str):
@@ -43,7 +50,7 @@ class TestStepWidget(ctk.CTkFrame):
 class MainWindow:
     def __init__(self, root: ctk.CTk):
         self.root = root
-        self.config = ConfigManager()
+        self.config = get_config()
         self.step_definitions = self._build_gui_definitions()
 
         self.root.title(self.config.app_title)
@@ -55,6 +62,13 @@ class MainWindow:
         self.stop_event = threading.Event()
         self.is_running = False
         self.step_widgets = {}
+        self.report_queue = queue.Queue(maxsize=REPORT_QUEUE_MAXSIZE)
+        # Subidas a la API en segundo plano; sobreviven al borrado del log entre tests
+        self.api_pending = 0
+        self.api_failed = []
+        self.api_status_var = ctk.StringVar(value="Plataforma: sin envíos pendientes")
+        # Controladores del HAL, creados en el primer test y reutilizados en los siguientes
+        self._hardware = None
 
         # --- Configuración del layout principal ---
         self.root.grid_columnconfigure(0, weight=1)  # Panel lateral
@@ -67,11 +81,13 @@ class MainWindow:
         self._create_main_panel()
         self._create_action_frame()
 
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._poll_report_queue()
+
     def _build_gui_definitions(self):
         """Construye la lista de pasos para la GUI a partir de la secuencia."""
         definitions = []
-        for i, step_info in enumerate(TEST_SEQUENCE):
-            step_key = step_info['key']
+        for i, (step_key, _) in enumerate(enabled_sequence(self.config.enabled_steps)):
             message_template = self.config.ui_messages.get(step_key, step_key)
             clean_name = message_template.replace("Paso {}: ", "")
             method_id = f"_{step_key}"
@@ -123,10 +139,21 @@ class MainWindow:
         self.start_stop_button = ctk.CTkButton(frame, text="INICIAR TEST", font=("", 16, "bold"), command=self.on_start_stop_button_click)
         self.start_stop_button.grid(row=0, column=0, padx=10, pady=10, ipady=10, sticky="ew")
 
+        # Estado de las subidas a la plataforma (no se borra al empezar otro test)
+        self.api_status_label = ctk.CTkLabel(frame, textvariable=self.api_status_var, font=("", 12), anchor="w",
+                                             justify="left")
+        self.api_status_label.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="ew")
+
     def log_message(self, message: str):
         """Añade un mensaje al cuadro de log de forma segura."""
+        self.log_messages([message])
+
+    def log_messages(self, messages: list):
+        """Añade varios mensajes al cuadro de log con una única inserción."""
+        if not messages:
+            return
         self.log_textbox.configure(state="normal")
-        self.log_textbox.insert("end", f"> {message}\n")
+        self.log_textbox.insert("end", "".join(f"> {message}\n" for message in messages))
         self.log_textbox.see("end")
         self.log_textbox.configure(state="disabled")
 
@@ -137,11 +164,56 @@ class MainWindow:
 
     def update_gui_callback(self, step_id: str, message: str, status: str):
         """Callback que el TestRunner usa para actualizar la GUI en tiempo real."""
-        def update_task():
-            self.log_message(message)
+        self.root.after(0, lambda: self._apply_report(step_id, message, status))
+
+    def _apply_report(self, step_id: str, message: str, status: str):
+        """Muestra un mensaje del TestRunner. Se ejecuta en el hilo de Tk."""
+        self.log_message(message)
+        if step_id in self.step_widgets:
+            self.step_widgets[step_id].set_status(status)
+        elif step_id == "api_send":
+            self._update_api_status(message, status)
+
+    def _update_api_status(self, message: str, status: str):
+        """
+        Lleva la cuenta de las subidas a la API. El runner avisa con TESTING al encolar
+        una subida y con INFO/FAIL al terminarla; los fallos quedan listados hasta cerrar.
+        """
+        status = status.upper()
+        if status == "TESTING":
+            self.api_pending += 1
+        else:
+            self.api_pending = max(0, self.api_pending - 1)
+            if status == "FAIL":
+                self.api_failed.append(message)
+
+        text = f"Plataforma: {self.api_pending} envío(s) pendiente(s)"
+        if self.api_failed:
+            text += f", {len(self.api_failed)} fallido(s). Último: {self.api_failed[-1]}"
+        self.api_status_var.set(text)
+        if self.api_failed:
+            self.api_status_label.configure(text_color=STATUS_COLORS["fail"])
+
+    def _drain_report_queue(self, max_items: int | None = REPORT_DRAIN_MAX_ITEMS):
+        """Aplica los mensajes pendientes de la cola (como mucho max_items; None = todos)."""
+        messages = []
+        while max_items is None or len(messages) < max_items:
+            try:
+                step_id, message, status = self.report_queue.get_nowait()
+            except queue.Empty:
+                break
+            messages.append(message)
             if step_id in self.step_widgets:
                 self.step_widgets[step_id].set_status(status)
-        self.root.after(0, lambda: update_task())
+            elif step_id == "api_send":
+                self._update_api_status(message, status)
+        # Todo el lote se vuelca al log de una vez
+        self.log_messages(messages)
+
+    def _poll_report_queue(self):
+        """Vacía la cola periódicamente para que el hilo del test nunca espere a la GUI."""
+        self._drain_report_queue()
+        self.root.after(REPORT_DRAIN_INTERVAL_MS, self._poll_report_queue)
 
     def on_start_stop_button_click(self):
         """Gestiona el clic en el botón principal, ya sea para iniciar o detener."""
@@ -167,6 +239,64 @@ class MainWindow:
 
         # Instancias de controladores
         try:
+            relay_ctrl, rs485_ctrl, ua_meter, ina3221_meter = self._get_hardware()
+
+            # Valida la secuencia de pasos antes de tocar el hardware
+            runner = TestRunner(
+                config_manager=self.config,
+                relay_controller=relay_ctrl,
+                serial_controller=rs485_ctrl,
+                ua_meter=ua_meter,
+                ma_meter=ina3221_meter,
+                gui_callback=self.update_gui_callback,
+                stop_event=self.stop_event,
+                report_queue=self.report_queue
+            )
+
+        except Exception as e:
+            # Si algo falla aquí, no podemos ni empezar el test
+            self.log_message(f"Error al inicializar hardware: {e}")
+            self.is_running = False
+            self.start_stop_button.configure(state="normal", text="INICIAR TEST")
+            return
+
+        test_thread = threading.Thread(target=self.run_and_finalize, args=(runner,), daemon=True)
+        test_thread.start()
+
+    def on_close(self):
+        """
+        Cierra la ventana liberando el hardware cacheado.
+
+        Si hay un test en curso se le pide que se detenga y se espera a que termine
+        antes de desconectar los controladores y cerrar los puertos del pool.
+        """
+        if self.is_running:
+            if not self.stop_event.is_set():
+                self.stop_test()
+            self.root.after(200, self.on_close)
+            return
+
+        if self._hardware is not None:
+            for controller in self._hardware:
+                try:
+                    controller.disconnect()
+                except Exception as e:
+                    print(f"Error al desconectar {type(controller).__name__}: {e}")
+            self._hardware = None
+
+        PowerMeterINA3221.clear_cache()
+        SerialPool.close_all()
+        self.root.destroy()
+
+    def _get_hardware(self) -> tuple:
+        """
+        Devuelve (relés, RS485, medidor uA, INA3221).
+
+        Se crean en el primer test y se reutilizan en los siguientes. Cada test los
+        sigue conectando y desconectando (los relés se apagan al terminar), pero sin
+        volver a construirlos.
+        """
+        if self._hardware is None:
             self.log_message("--- Inicializando controladores de hardware ---")
             relay_ctrl = RelayController(
                 num_relays=len(self.config.relay_map),
@@ -175,33 +305,19 @@ class MainWindow:
 
             rs485_ctrl = RS485Controller(
                 port=self.config.rs485_port,
-                baud_rate=self.config.rs485_baud_rate
+                baud_rate=self.config.rs485_baud_rate,
+                low_latency=self.config.rs485_latency_ms is not None,
+                latency_ms=self.config.rs485_latency_ms or 1
             )
 
-            ua_meter_config = self.config.hardware.get("power_meters", {}).get("ua_meter", {})
-            ua_meter = MeterFactory.create_ua_meter(ua_meter_config)
+            ua_meter = MeterFactory.create_ua_meter(self.config.ua_meter_config)
             if not ua_meter:
                 raise ValueError("Configuración del medidor de uA no encontrada o inválida.")
 
             ina3221_meter = PowerMeterINA3221(**self.config.ina3221_config)
 
-        except Exception as e:
-            # Si algo falla aquí, no podemos ni empezar el test
-            self.log_message(f"Error al inicializar hardware: {e}")
-            self.start_stop_button.configure(state="normal", text="INICIAR TEST")
-            return
-
-        runner = TestRunner(
-            config_manager=self.config,
-            relay_controller=relay_ctrl,
-            serial_controller=rs485_ctrl,
-            ua_meter=ua_meter,
-            ma_meter=ina3221_meter,
-            gui_callback=self.update_gui_callback,
-            stop_event=self.stop_event
-        )
-        test_thread = threading.Thread(target=self.run_and_finalize, args=(runner,), daemon=True)
-        test_thread.start()
+            self._hardware = (relay_ctrl, rs485_ctrl, ua_meter, ina3221_meter)
+        return self._hardware
 
     def _reset_ui_state(self):
         """Resetea la GUI a su estado inicial antes de un nuevo test."""
@@ -216,6 +332,8 @@ class MainWindow:
         final_result = runner.run_full_test()
 
         def final_update():
+            # Los últimos mensajes deben verse antes que el resultado final
+            self._drain_report_queue(max_items=None)
             self.is_running = False
             if final_result == "PASS":
                 self.set_overall_status("PASS", STATUS_COLORS["pass"])
@@ -3,6 +3,7 @@ Módulo para el medidor de intensidad BLU939.
 Implementa la interfaz CurrentMeterInterface.
 """
 
+import itertools
 import logging
 import time
 from typing import Optional, List, Tuple
@@ -45,6 +46,9 @@ class BLUMeter(CurrentMeterInterface):
         Returns:
             True si la conexión fue exitosa, False en caso contrario
         """
+        if self.is_connected and self.device:
+            return True  # Ya conectado: no se vuelve a enumerar el USB
+
         try:
             # Buscar dispositivos BLU2 conectados
             blu2s_connected = BLU2_API.list_devices()
@@ -173,20 +177,29 @@ class BLUMeter(CurrentMeterInterface):
             # Iniciar medición
             self.device.start_measuring()
 
-            all_samples = []
+            # Se acumula suma y número de muestras en lugar de guardarlas todas en una lista
+            total = 0.0
+            count = 0
             attempts = 0
             max_attempts = 100  # Máximo número de intentos para obtener suficientes muestras
+            # Referencias locales para el bucle de lectura
+            get_data = self.device.get_data
+            get_samples = self.device.get_samples
 
-            while len(all_samples) < samples and attempts < max_attempts:
+            while count < samples and attempts < max_attempts:
                 # Leer datos del dispositivo
-                read_data = self.device.get_data()
+                read_data = get_data()
 
                 if read_data != b'':
-                    # Convertir datos a muestras
-                    current_samples, raw_digital = self.device.get_samples(read_data)
-                    all_samples.extend(current_samples)
+                    # Convertir datos a muestras y tomar solo las que faltan
+                    current_samples, raw_digital = get_samples(read_data)
+                    remaining = samples - count
+                    if len(current_samples) > remaining:
+                        current_samples = current_samples[:remaining]
+                    total += sum(current_samples)
+                    count += len(current_samples)
 
-                    self.logger.debug(f"Obtenidas {len(current_samples)} muestras. Total: {len(all_samples)}")
+                    self.logger.debug(f"Obtenidas {len(current_samples)} muestras. Total: {count}")
 
                 attempts += 1
                 time.sleep(0.01)  # Pequeña pausa entre lecturas
@@ -194,12 +207,10 @@ class BLUMeter(CurrentMeterInterface):
             # Detener medición
             self.device.stop_measuring()
 
-            if all_samples:
-                # Tomar solo las muestras solicitadas
-                samples_to_use = all_samples[:samples]
-                avg_current = sum(samples_to_use) / len(samples_to_use)
+            if count:
+                avg_current = total / count
 
-                self.logger.debug(f"Medición promedio: {avg_current:.2f} μA ({len(samples_to_use)} muestras)")
+                self.logger.debug(f"Medición promedio: {avg_current:.2f} μA ({count} muestras)")
                 return avg_current
             else:
                 self.logger.error("No se pudieron obtener mediciones")
@@ -231,24 +242,28 @@ class BLUMeter(CurrentMeterInterface):
 
         try:
             measurements = []
-            start_time = time.time()
+            # Referencias locales para el bucle de lectura
+            get_data = self.device.get_data
+            get_samples = self.device.get_samples
+            add_measurements = measurements.extend
+            now = time.time
+            start_time = now()
 
             # Iniciar medición
             self.device.start_measuring()
 
-            while (time.time() - start_time) < duration_s:
-                current_time = time.time() - start_time
+            while (now() - start_time) < duration_s:
+                current_time = now() - start_time
 
                 # Leer datos del dispositivo
-                read_data = self.device.get_data()
+                read_data = get_data()
 
                 if read_data != b'':
                     # Convertir datos a muestras
-                    current_samples, raw_digital = self.device.get_samples(read_data)
+                    current_samples, raw_digital = get_samples(read_data)
 
-                    # Agregar cada muestra con su timestamp
-                    for sample in current_samples:
-                        measurements.append((current_time, sample))
+                    # Agregar cada muestra con su timestamp (sin bucle Python por muestra)
+                    add_measurements(zip(itertools.repeat(current_time), current_samples))
 
                 time.sleep(0.01)  # Pequeña pausa entre lecturas
 
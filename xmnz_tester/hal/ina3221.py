@@ -5,6 +5,11 @@ class PowerMeterINA3221:
     Clase para interactuar con el sensor de potencia INA3221 a través de I2C.
     Abstrae la librería ina219 para presentar una interfaz coherente.
     """
+    # Canales ya configurados por (bus, dirección, shunt), compartidos entre instancias
+    # para no reabrir el bus ni reprogramar el sensor en cada test del proceso.
+    # Se invalida si una lectura falla (p. ej. el sensor se reinició) y con clear_cache().
+    _channel_cache = {}
+
     def __init__(self, i2c_bus: int, i2c_address: int, shunt_resistance_ohms: float):
         """
         Inicializa el sensor INA3221.
@@ -19,11 +24,29 @@ class PowerMeterINA3221:
         self.i2c_bus = i2c_bus
         self.channels = []
 
+    @property
+    def _cache_key(self) -> tuple:
+        return (self.i2c_bus, self.address, self.shunt_ohms)
+
+    @classmethod
+    def clear_cache(cls):
+        """Olvida los canales configurados; el siguiente connect() reprograma el sensor."""
+        cls._channel_cache.clear()
+
     def connect(self):
         """
         Configura los tres canales del INA3221.
         En I2C no hay una 'conexión' real, pero usamos este método para inicializar.
+        Si los canales ya están configurados no hace nada.
         """
+        if self.channels:
+            return
+
+        cached = self._channel_cache.get(self._cache_key)
+        if cached is not None:
+            self.channels = cached
+            return
+
         print(f"Configurando INA3221 en la dirección I2C 0x{self.address:X}...")
         try:
             # La librería maneja cada canal como una instancia separada de INA219
@@ -34,6 +57,7 @@ class PowerMeterINA3221:
             ]
             for channel in self.channels:
                 channel.configure()
+            self._channel_cache[self._cache_key] = self.channels
             print("Sensor INA3221 configurado correctamente.")
         except Exception as e:
             print(f"Error al configurar el INA3221: {e}")
@@ -41,8 +65,8 @@ class PowerMeterINA3221:
 
     def disconnect(self):
         """Método de desconexión por consistencia con otros módulos HAL."""
+        self.channels = []
         print("Recurso INA3221 liberado.")
-        pass
 
     def read_channel(self, channel_number: int) -> dict | None:
         """
@@ -65,6 +89,27 @@ class PowerMeterINA3221:
         except DeviceRangeError as e:
             print(f"Error de rango en el canal {channel_number}: {e}. La corriente podría ser demasiado alta.")
             return None
+        except Exception:
+            # El sensor pudo reiniciarse con la calibración por defecto: se descartan los
+            # canales para que el siguiente connect() vuelva a configurarlo
+            self._channel_cache.pop(self._cache_key, None)
+            self.channels = []
+            raise
+
+    def read_channels(self, channel_numbers=None) -> dict:
+        """
+        Lee varios canales en una sola pasada.
+
+        Args:
+            channel_numbers: Canales a leer (1, 2 o 3). Si es None se leen todos.
+
+        Returns:
+            Un diccionario {canal: datos}, con el mismo formato que read_channel()
+            (None para los canales que den error de rango).
+        """
+        if channel_numbers is None:
+            channel_numbers = range(1, len(self.channels) + 1)
+        return {channel: self.read_channel(channel) for channel in channel_numbers}
 
     def __enter__(self):
         self.connect()
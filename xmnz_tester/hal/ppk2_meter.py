@@ -3,6 +3,7 @@ Módulo para el medidor de intensidad Nordic Power Profiler Kit II (PPK2).
 Implementa la interfaz CurrentMeterInterface.
 """
 
+import itertools
 import logging
 import time
 from typing import Optional, List, Tuple
@@ -18,6 +19,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Cada muestra del flujo de medida del PPK2 ocupa 4 bytes
+PPK2_SAMPLE_BYTES = 4
+
 
 class PPK2Meter(CurrentMeterInterface):
     """
@@ -47,6 +51,9 @@ class PPK2Meter(CurrentMeterInterface):
         Returns:
             True si la conexión fue exitosa, False en caso contrario.
         """
+        if self.is_connected and self.device:
+            return True  # Ya conectado: no se vuelve a enumerar el USB
+
         self.logger.info(f"Buscando PPK2 (S/N: {self.serial_number or 'cualquiera'})...")
         try:
             all_ports = list_ports.comports()
@@ -76,6 +83,11 @@ class PPK2Meter(CurrentMeterInterface):
             self.device = PPK2_API(self.port)
             self.device.get_modifiers()  # Inicialización necesaria
 
+            # El modo fuente y su tensión se configuran una sola vez por conexión; los pasos
+            # del test solo encienden o apagan la salida.
+            self.device.use_source_meter()
+            self.device.set_source_voltage(self.source_voltage_mv)
+
             self.is_connected = True
             self.logger.info(f"Conectado al PPK2 en {self.port} (S/N: {actual_serial}).")
             return True
@@ -96,23 +108,30 @@ class PPK2Meter(CurrentMeterInterface):
 
                 self.device = None
                 self.is_connected = False
+                self.is_source_enabled = False
                 self.logger.info("Desconectado del medidor PPK2.")
         except Exception as e:
             self.logger.error(f"Error al desconectar del medidor PPK2: {e}")
 
-    def set_source_enabled(self, enabled: bool):
-        """Activa o desactiva la salida de VOUT."""
+    def set_source_enabled(self, enabled: bool) -> bool:
+        """
+        Activa o desactiva la salida de VOUT.
+        Si ya está en el estado pedido no se reenvía, para no provocar cortes en el DUT.
+        """
         if not self.is_connected:
             logging.error("PPK2 no conectado.")
-            return
+            return False
+        if enabled == self.is_source_enabled:
+            return True
         try:
-            # Habilitar la medición es un prerrequisito para usar la fuente
-            self.device.enable_source_measurement()
-            self.device.set_source_enabled(enabled)
+            self.device.toggle_DUT_power("ON" if enabled else "OFF")
+            self.is_source_enabled = enabled
             state = "activada" if enabled else "desactivada"
             logging.info(f"Fuente de alimentación del PPK2 {state}.")
+            return True
         except Exception as e:
             logging.error(f"Error al cambiar el estado de la fuente del PPK2: {e}")
+            return False
 
     def set_voltage(self, millivolts: int) -> bool:
         """Configura la tensión de salida del PPK2 y activa la fuente."""
@@ -122,8 +141,11 @@ class PPK2Meter(CurrentMeterInterface):
 
         try:
             self.device.set_source_voltage(millivolts)
+            self.source_voltage_mv = millivolts
+            self.source_voltage_v = millivolts / 1000.0
 
-            self.set_source_enabled(True)
+            if not self.set_source_enabled(True):
+                return False
 
             logging.info(f"PPK2 suministrando {millivolts} mV.")
             return True
@@ -140,26 +162,32 @@ class PPK2Meter(CurrentMeterInterface):
         try:
             self.device.start_measuring()
 
-            all_samples = []
+            # Se acumulan los bytes crudos y se decodifican una sola vez al final
+            raw = bytearray()
+            needed_bytes = samples * PPK2_SAMPLE_BYTES
             max_attempts = 100
             attempts = 0
-            while len(all_samples) < samples and attempts < max_attempts:
-                read_data = self.device.get_data()
+            get_data = self.device.get_data
+            while len(raw) < needed_bytes and attempts < max_attempts:
+                read_data = get_data()
                 if read_data:
-                    current_samples, _ = self.device.get_samples(read_data)
-                    all_samples.extend(current_samples)
+                    raw += read_data
                 attempts += 1
                 time.sleep(0.01)
 
             self.device.stop_measuring()
 
-            if not all_samples:
+            current_samples, _ = self.device.get_samples(bytes(raw)) if raw else ([], None)
+            current_samples = current_samples[:samples]
+            total = sum(current_samples)
+            count = len(current_samples)
+
+            if not count:
                 self.logger.error("No se pudieron obtener mediciones del PPK2.")
                 return None
 
-            samples_to_use = all_samples[:samples]
-            avg_current = sum(samples_to_use) / len(samples_to_use)
-            self.logger.debug(f"Medición promedio: {avg_current:.2f} μA ({len(samples_to_use)} muestras).")
+            avg_current = total / count
+            self.logger.debug(f"Medición promedio: {avg_current:.2f} μA ({count} muestras).")
             return avg_current
 
         except Exception as e:
@@ -178,17 +206,21 @@ class PPK2Meter(CurrentMeterInterface):
 
         try:
             measurements = []
+            # Referencias locales para el bucle de lectura
+            get_data = self.device.get_data
+            get_samples = self.device.get_samples
+            add_measurements = measurements.extend
+            now = time.time
             self.device.start_measuring()
-            start_time = time.time()
+            start_time = now()
 
-            while (time.time() - start_time) < duration_s:
-                read_data = self.device.get_data()
+            while (now() - start_time) < duration_s:
+                read_data = get_data()
                 if read_data:
-                    current_samples, _ = self.device.get_samples(read_data)
+                    current_samples, _ = get_samples(read_data)
                     # Asociar todas las muestras de este paquete al mismo timestamp
-                    timestamp = time.time() - start_time
-                    for sample in current_samples:
-                        measurements.append((timestamp, sample))
+                    timestamp = now() - start_time
+                    add_measurements(zip(itertools.repeat(timestamp), current_samples))
                 time.sleep(0.01)
 
             self.device.stop_measuring()
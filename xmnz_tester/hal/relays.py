@@ -17,6 +17,9 @@ class RelayController:
         self.num_relays = num_relays
         self.serial_number = serial_number if serial_number else None
         self.relay_device = None # Aquí guardaremos el objeto de la librería
+        # Última máscara escrita o leída (bit 0 = relé 1); None = desconocida.
+        # Se asume que solo este proceso maneja la placa mientras está conectada.
+        self._state_cache = None
 
     def connect(self):
         """Encuentra y se conecta a la placa de relés HID."""
@@ -40,6 +43,7 @@ class RelayController:
             print("Desconectando, apagando todos los relés...")
             self.all_off()
             self.relay_device = None
+            self._state_cache = None
             print("Recurso del relé liberado.")
 
     def set_relay(self, relay_num: int, state: bool):
@@ -59,27 +63,116 @@ class RelayController:
         print(f"Estableciendo relé #{relay_num} en {'ON' if state else 'OFF'}")
         self.relay_device.set_state(relay_num, state)
         time.sleep(0.05)
+        if self._state_cache is not None:
+            bit = 1 << (relay_num - 1)
+            self._state_cache = self._state_cache | bit if state else self._state_cache & ~bit
+
+    def set_mask(self, mask: int):
+        """
+        Establece el estado de todos los relés a partir de una máscara de bits.
+
+        Apagar todos se hace con un único informe HID; en otro caso solo se
+        escriben los relés cuyo estado cambia respecto al último conocido.
+
+        Args:
+            mask (int): Estado deseado, bit 0 = relé 1 (1 = ON, 0 = OFF).
+        """
+        full_mask = (1 << self.num_relays) - 1
+        if not 0 <= mask <= full_mask:
+            raise ValueError(f"Máscara de relés inválida: {mask:#x}. Debe estar entre 0 y {full_mask:#x}.")
+
+        if self.relay_device is None:
+            raise ConnectionError("No conectado. Llama a 'connect()' primero.")
+
+        if mask == 0:
+            self.relay_device.set_state("all", False)
+            time.sleep(0.05)
+            self._state_cache = 0
+            return
+
+        self._write_changed(mask, self._known_mask())
+
+    def set_relays(self, states: dict):
+        """
+        Establece varios relés a la vez, p. ej. {1: True, 2: False}.
+
+        Solo se escriben los relés que cambian respecto al último estado conocido
+        (la placa se lee únicamente si aún no se conoce); el resto no se toca. La placa HID no admite escribir una
+        máscara arbitraria en un único informe, salvo apagarlos todos.
+
+        Args:
+            states (dict): Número de relé (empezando en 1) -> estado deseado.
+        """
+        for relay_num in states:
+            if not 1 <= relay_num <= self.num_relays:
+                raise ValueError(f"Número de relé inválido: {relay_num}. Debe estar entre 1 y {self.num_relays}.")
+
+        if self.relay_device is None:
+            raise ConnectionError("No conectado. Llama a 'connect()' primero.")
+
+        current = self._known_mask()
+        mask = current
+        for relay_num, state in states.items():
+            bit = 1 << (relay_num - 1)
+            mask = mask | bit if state else mask & ~bit
+
+        if mask == 0 and current:
+            self.relay_device.set_state("all", False)
+            time.sleep(0.05)
+            self._state_cache = 0
+            return
+
+        self._write_changed(mask, current)
+
+    def _write_changed(self, mask: int, current: int):
+        """Escribe solo los relés cuyo bit difiere entre 'current' y 'mask'."""
+        changed = mask ^ current
+        for i in range(self.num_relays):
+            if changed >> i & 1:
+                self.relay_device.set_state(i + 1, bool(mask >> i & 1))
+                time.sleep(0.05)
+        self._state_cache = mask
+
+    def _known_mask(self) -> int:
+        """Devuelve la máscara en caché o, si no se conoce, la lee de la placa."""
+        if self._state_cache is None:
+            return self.get_mask()
+        return self._state_cache
+
+    def get_mask(self) -> int:
+        """
+        Lee el estado de todos los relés con una única petición HID.
+
+        Returns:
+            int: Máscara con el estado de los relés, bit 0 = relé 1.
+        """
+        if self.relay_device is None:
+            raise ConnectionError("No conectado. Llama a 'connect()' primero.")
+
+        # get_state() refresca el registro de estado completo de la placa
+        self.relay_device.get_state(1)
+        self._state_cache = self.relay_device.state & ((1 << self.num_relays) - 1)
+        return self._state_cache
 
     def all_on(self):
         """Enciende todos los relés de la placa."""
         if self.relay_device:
-            for i in range(1, self.num_relays + 1):
-                self.relay_device.set_state(i, True)
-                time.sleep(0.05)
+            self.set_mask((1 << self.num_relays) - 1)
 
     def all_off(self):
         """Apaga todos los relés de la placa."""
         if self.relay_device:
-            for i in range(1, self.num_relays + 1):
-                self.relay_device.set_state(i, False)
-                time.sleep(0.05)
+            self.set_mask(0)
 
-    def get_relay_state(self, relay_num: int) -> bool:
+    def get_relay_state(self, relay_num: int, *, from_cache: bool = False) -> bool:
         """
         Obtiene el estado actual de un relé específico.
 
         Args:
             relay_num (int): El número del relé a consultar (empezando en 1).
+            from_cache (bool): Devuelve el último estado escrito sin consultar la placa
+                (si se conoce). Por defecto se lee la placa, que es lo que verifica
+                que el relé ha conmutado realmente.
 
         Returns:
             bool: True si el relé está encendido, False si está apagado.
@@ -90,6 +183,8 @@ class RelayController:
         if self.relay_device is None:
             raise ConnectionError("No conectado. Llama a 'connect()' primero.")
 
+        if from_cache and self._state_cache is not None:
+            return bool(self._state_cache >> (relay_num - 1) & 1)
         return self.relay_device.get_state(relay_num)
 
     def __enter__(self):
@@ -1,13 +1,18 @@
 import serial
+import threading
 import time
 from typing import List
 
+from ..dut_commands import DutCommands
+from .serial_pool import SerialPool, enable_low_latency
+
 class RS485Controller:
     """
     Gestiona la comunicación con un dispositivo a través de un adaptador USB-RS485,
     adaptado para una CLI con respuestas multilínea y con un prompt '#'.
     """
-    def __init__(self, port: str, baud_rate: int = 115200, timeout: float = 2.0):
+    def __init__(self, port: str, baud_rate: int = 115200, timeout: float = 2.0, low_latency: bool = True,
+                 latency_ms: int = 1):
         """
         Inicializa el controlador RS485.
 
@@ -15,6 +20,11 @@ class RS485Controller:
             port (str): El puerto serie (ej. 'COM4' o '/dev/ttyUSB0').
             baud_rate (int): Velocidad de comunicación.
             timeout (float): Tiempo de espera en segundos para las lecturas.
+            low_latency (bool): Activa el modo de baja latencia del puerto (ASYNC_LOW_LATENCY
+                                en Linux) para no esperar al temporizador de 16 ms del
+                                adaptador USB en cada respuesta.
+            latency_ms (int): Latencia a aplicar si low_latency está activo
+                              (latency_timer de los FTDI, 1-255 ms).
         """
         if not port:
             raise ValueError("El puerto no puede ser nulo. Verifica tu 'config.yaml'.")
@@ -22,12 +32,30 @@ class RS485Controller:
         self.port = port
         self.baud_rate = baud_rate
         self.timeout = timeout
+        self.low_latency = low_latency
+        self.latency_ms = latency_ms
         self.serial_conn = None
+        # Serializa las transacciones (send_command, wait_for_prompt): una
+        # respuesta no debe mezclarse con la de otro comando si se comparte entre hilos
+        self._lock = threading.Lock()
 
     def connect(self):
-        """Abre la conexión con el puerto serie y espera a que el dispositivo esté listo (prompt '#')."""
+        """
+        Obtiene el puerto serie del pool (se abre solo la primera vez).
+        Si ya está conectado no hace nada.
+        """
+        if self.serial_conn is not None:
+            if self.serial_conn.is_open:
+                return
+            # Se cerró tras un error de E/S: se descarta del pool y se abre de nuevo
+            SerialPool.release(self.serial_conn)
+            self.serial_conn = None
         try:
-            self.serial_conn = serial.Serial(self.port, self.baud_rate, timeout=self.timeout)
+            on_open = None
+            if self.low_latency:
+                # Solo al abrir el puerto; al reutilizarlo del pool ya está configurado
+                on_open = lambda conn: enable_low_latency(conn, self.port, self.latency_ms)
+            self.serial_conn = SerialPool.acquire(self.port, self.baud_rate, self.timeout, on_open=on_open)
             print(f"Conectado al dispositivo RS485 en {self.port}.")
             # self.wait_for_prompt()
         except serial.SerialException as e:
@@ -35,18 +63,22 @@ class RS485Controller:
             raise
 
     def disconnect(self):
-        """Cierra la conexión del puerto serie."""
-        if self.serial_conn and self.serial_conn.is_open:
-            self.serial_conn.close()
+        """Devuelve el puerto al pool; queda abierto para el siguiente test."""
+        if self.serial_conn is not None:
+            SerialPool.release(self.serial_conn)
+            self.serial_conn = None
             print("Desconectado de RS485 de forma segura.")
 
-    def send_command(self, command: str) -> List[str] | None:
+    def send_command(self, command: str | bytes, timeout_s: float | None = None) -> List[str] | None:
         """
         Envía un comando, filtra el eco y lee la respuesta multilínea
         hasta encontrar el prompt ('#').
 
         Args:
-            command (str): El comando a enviar.
+            command (str | bytes): El comando a enviar. Si ya viene en bytes
+                                   (con su terminador) se escribe tal cual.
+            timeout_s (float, optional): Tiempo máximo de espera por línea solo para este
+                                         comando. Por defecto, el timeout del puerto.
 
         Returns:
             List[str] | None: Una lista con las líneas de la respuesta,
@@ -55,13 +87,65 @@ class RS485Controller:
         if self.serial_conn is None or not self.serial_conn.is_open:
             raise ConnectionError("No conectado. Llama a 'connect()' primero.")
 
-        # Limpiar el buffer de entrada para descartar datos antiguos
-        self.serial_conn.reset_input_buffer()
+        with self._lock:
+            if timeout_s is None:
+                return self._transact(command)
+
+            previous_timeout = self.serial_conn.timeout
+            self.serial_conn.timeout = timeout_s
+            try:
+                return self._transact(command)
+            finally:
+                self.serial_conn.timeout = previous_timeout
+
+    @staticmethod
+    def _encode(command: str | bytes) -> tuple[str, bytes]:
+        """Devuelve (texto del comando, bytes a escribir con su terminador)."""
+        if isinstance(command, bytes):
+            return command.decode('utf-8').strip(), command
+        return command, DutCommands.as_bytes(command)
+
+    def _transact(self, command: str | bytes) -> List[str] | None:
+        """Escribe el comando y lee la respuesta hasta el prompt. Requiere tener el lock."""
+        command, payload = self._encode(command)
 
         print(f"TX --> {command}")
-        self.serial_conn.write(f"{command}\n".encode('utf-8'))
-        self.serial_conn.flush()
+        if not self._write(payload):
+            return None
+
+        return self._read_response(command)
+
+    def _write(self, payload: bytes) -> bool:
+        """
+        Limpia el buffer de entrada (datos antiguos) y escribe payload. Requiere tener el lock.
+
+        Returns:
+            bool: False si el puerto falló; en ese caso queda cerrado (ver _discard_connection).
+        """
+        try:
+            self.serial_conn.reset_input_buffer()
+            self.serial_conn.write(payload)
+            self.serial_conn.flush()
+            return True
+        except (serial.SerialException, OSError) as e:
+            self._discard_connection(e)
+            return False
+
+    def _discard_connection(self, error: Exception):
+        """
+        Cierra un puerto que ha dado un error de E/S (p. ej. adaptador USB desconectado).
+
+        pyserial sigue indicando is_open en un descriptor muerto; al cerrarlo, release()
+        lo saca del pool y el siguiente connect() abre el puerto de nuevo.
+        """
+        print(f"Error de E/S en {self.port}: {error}. Se cierra el puerto.")
+        try:
+            self.serial_conn.close()
+        except (serial.SerialException, OSError):
+            pass
 
+    def _read_response(self, command: str) -> List[str] | None:
+        """Lee líneas hasta el prompt '#', descartando el eco del comando. Requiere tener el lock."""
         response_lines = []
         while True:
             try:
@@ -79,8 +163,9 @@ class RS485Controller:
                 if line_str and line_str.lower() != command.lower():
                     response_lines.append(line_str)
 
-            except serial.SerialException as e:
+            except (serial.SerialException, OSError) as e:
                 print(f"Error durante la lectura del puerto serie: {e}")
+                self._discard_connection(e)
                 return None
 
         print(f"RX <-- {response_lines}")
@@ -90,11 +175,16 @@ class RS485Controller:
         """Lee y descarta datos del buffer hasta encontrar el prompt '#' o que se agote el tiempo."""
         print("Esperando al prompt del dispositivo ('#')...")
         start_time = time.time()
-        while time.time() - start_time < timeout_s:
-            line_bytes = self.serial_conn.readline()
-            if line_bytes and line_bytes.strip().startswith(b'#'):
-                print("Prompt '#' detectado. El dispositivo está listo.")
-                return True
+        with self._lock:
+            while time.time() - start_time < timeout_s:
+                try:
+                    line_bytes = self.serial_conn.readline()
+                except (serial.SerialException, OSError) as e:
+                    self._discard_connection(e)
+                    raise
+                if line_bytes and line_bytes.strip().startswith(b'#'):
+                    print("Prompt '#' detectado. El dispositivo está listo.")
+                    return True
         raise TimeoutError(f"No se detectó el prompt '#' en {timeout_s} segundos.")
 
     def check_initial_status(self) -> dict:
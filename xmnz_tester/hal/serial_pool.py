@@ -0,0 +1,124 @@
+"""
+Pool de puertos serie abiertos, compartido por los controladores del proceso.
+
+Abrir y reconfigurar un tty cuesta cientos de ms; en una estación que prueba un DUT
+tras otro, el puerto se deja abierto entre tests y se reutiliza en el siguiente.
+"""
+
+import atexit
+import os
+import threading
+
+import serial
+
+
+class SerialPool:
+    """
+    Mantiene como mucho un puerto abierto por (puerto, baudios).
+
+    acquire() entrega el puerto (abriéndolo si hace falta) y release() lo devuelve al
+    pool sin cerrarlo. Los puertos se cierran al salir del intérprete o con close_all().
+    Un puerto que el usuario haya cerrado (p. ej. tras un error de E/S) se descarta al
+    devolverlo, y el siguiente acquire() lo vuelve a abrir.
+    """
+    maxsize = 4
+
+    _handles = {}  # (port, baud_rate) -> serial.Serial
+    _in_use = set()  # Claves entregadas y aún no devueltas
+    _lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, port: str, baud_rate: int, timeout: float, on_open=None) -> serial.Serial:
+        """
+        Devuelve un puerto abierto para (port, baud_rate).
+
+        Args:
+            on_open (callable, optional): Se llama con el puerto solo cuando se acaba de
+                abrir (no al reutilizarlo), para configurarlo una única vez.
+
+        Raises:
+            serial.SerialException: Si el puerto ya está en uso o no se puede abrir.
+        """
+        key = (port, baud_rate)
+        with cls._lock:
+            if key in cls._in_use:
+                raise serial.SerialException(f"El puerto {port} ya está en uso.")
+
+            conn = cls._handles.get(key)
+            if conn is None or not conn.is_open:
+                if len(cls._handles) >= cls.maxsize:
+                    cls._evict_idle()
+                conn = serial.Serial(port, baud_rate, timeout=timeout)
+                cls._handles[key] = conn
+                if on_open is not None:
+                    on_open(conn)
+            else:
+                conn.timeout = timeout
+
+            cls._in_use.add(key)
+            return conn
+
+    @classmethod
+    def release(cls, conn: serial.Serial):
+        """Devuelve un puerto al pool. Si ya no está abierto se descarta."""
+        with cls._lock:
+            for key, pooled in list(cls._handles.items()):
+                if pooled is conn:
+                    cls._in_use.discard(key)
+                    if not conn.is_open:
+                        del cls._handles[key]
+                    return
+
+    @classmethod
+    def close_all(cls):
+        """Cierra todos los puertos del pool."""
+        with cls._lock:
+            for conn in cls._handles.values():
+                if conn.is_open:
+                    conn.close()
+            cls._handles.clear()
+            cls._in_use.clear()
+
+    @classmethod
+    def _evict_idle(cls):
+        """Cierra un puerto libre para hacer sitio. Requiere tener el lock."""
+        for key, conn in list(cls._handles.items()):
+            if key not in cls._in_use:
+                conn.close()
+                del cls._handles[key]
+                return
+        raise serial.SerialException(f"Pool de puertos serie lleno ({cls.maxsize} en uso).")
+
+
+def enable_low_latency(serial_conn: serial.Serial, port: str, latency_ms: int = 1) -> bool:
+    """
+    Reduce la latencia de un adaptador USB-serie (por defecto espera hasta 16 ms por lectura).
+
+    Con latency_ms=1 primero activa ASYNC_LOW_LATENCY con TIOCSSERIAL (como 'setserial
+    <port> low_latency'). Si el driver no lo admite, o se pide otro valor, escribe
+    latency_ms en el latency_timer de sysfs (adaptadores FTDI).
+
+    Returns:
+        bool: True si se aplicó alguno de los dos mecanismos.
+    """
+    ioctl_error = None
+    if latency_ms <= 1:
+        try:
+            serial_conn.set_low_latency_mode(True)
+            return True
+        except (AttributeError, NotImplementedError, OSError, ValueError) as e:
+            # AttributeError: pyserial no lo implementa fuera de Linux
+            ioctl_error = e
+
+    tty_name = os.path.basename(os.path.realpath(port))
+    latency_path = f"/sys/bus/usb-serial/devices/{tty_name}/latency_timer"
+    try:
+        with open(latency_path, "w") as f:
+            f.write(str(max(1, int(latency_ms))))
+        return True
+    except OSError as e:
+        print(f"AVISO: No se pudo ajustar la latencia de {port} a {latency_ms} ms: {ioctl_error or e}")
+        return False
+
+
+atexit.register(SerialPool.close_all)
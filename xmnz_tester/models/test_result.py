@@ -2,6 +2,9 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List
 import datetime
 
+# Estados que marcan el test como fallido; el resto no altera el resultado global
+_FAIL_BIT = {"FAIL": 1}
+
 @dataclass
 class TestStepResult:
     """Representa el resultado de un único paso del test."""
@@ -17,16 +20,30 @@ class TestResult:
     """Representa el resultado completo de una ejecución de test para un DUT."""
     station_id: str
     serial_number: str = "NOT_READ"
-    overall_status: str = "PASS"
     start_time: datetime.datetime = field(default_factory=datetime.datetime.now)
     end_time: datetime.datetime | None = None
-    steps: List[TestStepResult] = field(default_factory=list)
+    # Pasos como tuplas (step_name, status, message, details); se convierten al serializar
+    _step_rows: List[tuple] = field(default_factory=list, repr=False)
+    # Bit 0 activo si algún paso ha fallado
+    _status_bits: int = field(default=0, repr=False)
+
+    @property
+    def overall_status(self) -> str:
+        return "FAIL" if self._status_bits else "PASS"
+
+    @property
+    def steps(self) -> List[TestStepResult]:
+        """Pasos registrados, construidos a partir de las tuplas guardadas."""
+        return [TestStepResult(*row) for row in self._step_rows]
 
     def add_step(self, step: TestStepResult):
         """Añade un paso al resultado y actualiza el estado general."""
-        self.steps.append(step)
-        if step.status == "FAIL":
-            self.overall_status = "FAIL"
+        self.add_step_raw(step.step_name, step.status, step.message, step.details)
+
+    def add_step_raw(self, step_name: str, status: str, message: str, details: Dict[str, Any]):
+        """Como add_step(), pero sin crear el TestStepResult."""
+        self._step_rows.append((step_name, status, message, details))
+        self._status_bits |= _FAIL_BIT.get(status, 0)
 
     def finalize(self):
         """Marca el test como finalizado, estableciendo la hora de fin."""
@@ -40,5 +57,8 @@ class TestResult:
             "overall_status": self.overall_status,
             "start_time": self.start_time.isoformat(),
             "end_time": self.end_time.isoformat() if self.end_time else None,
-            "steps": [step.__dict__ for step in self.steps]
+            "steps": [
+                {"step_name": name, "status": status, "message": message, "details": details}
+                for name, status, message, details in self._step_rows
+            ]
         }
\ No newline at end of file
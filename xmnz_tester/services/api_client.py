@@ -1,12 +1,16 @@
 import requests
 import json
+from requests.adapters import HTTPAdapter
 from xmnz_tester.models.test_result import TestResult
 
 class ApiClient:
     """
     Cliente para enviar los resultados del test a la API central.
+
+    Mantiene una requests.Session, de modo que envíos consecutivos reutilizan la
+    conexión TCP/TLS con el servidor en lugar de negociarla en cada test.
     """
-    def __init__(self, endpoint_url: str = None, api_key: str = None, timeout_s: int = 10):
+    def __init__(self, endpoint_url: str = None, api_key: str = None, timeout_s: int = 10, pool_maxsize: int = 1):
         """
         Inicializa el cliente con la configuración de la API.
 
@@ -14,11 +18,21 @@ class ApiClient:
             endpoint_url (str): URL del endpoint de la API donde se enviarán los resultados.
             api_key (str): Clave de API para autenticación.
             timeout_s (int): Tiempo máximo de espera para la respuesta de la API en segundos.
+            pool_maxsize (int): Conexiones abiertas que se conservan (una por envío simultáneo).
         """
         self.endpoint_url = endpoint_url
         self.api_key = api_key
         self.timeout = timeout_s
 
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        })
+
     def send_test_result(self, test_result: TestResult) -> bool:
         """
         Envía el objeto de resultado del test a la API.
@@ -33,19 +47,13 @@ class ApiClient:
             print("URL de la API no configurada. No se enviarán los resultados.")
             return False
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-
         payload = test_result.to_dict()
 
         print(f"Enviando resultados a {self.endpoint_url}...")
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.endpoint_url,
-                headers=headers,
                 data=json.dumps(payload, indent=2),
                 timeout=self.timeout
             )
@@ -57,4 +65,8 @@ class ApiClient:
 
         except requests.exceptions.RequestException as e:
             print(f"Error al enviar los resultados a la API: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def close(self):
+        """Cierra las conexiones abiertas de la sesión."""
+        self.session.close()